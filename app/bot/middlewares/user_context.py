@@ -37,7 +37,8 @@ class UserContextMiddleware(BaseMiddleware):
             await self._send_not_supported(event, i18n.gettext("group.not_supported", locale=locale))
             return
 
-        subscription_service = SubscriptionService(session)
+        subscription_service = SubscriptionService(session, settings)
+        now = utc_now()
 
         stmt = select(User).where(User.telegram_id == from_user.id)
         result = await session.execute(stmt)
@@ -53,11 +54,11 @@ class UserContextMiddleware(BaseMiddleware):
             session.add(user)
             await session.flush()
 
-            await subscription_service.ensure_default_subscription(user)
+            await subscription_service.ensure_default_subscription(user, now=now)
 
-        await subscription_service.expire_outdated_subscriptions(user)
+        await subscription_service.expire_outdated_subscriptions(user, now=now)
 
-        user.last_seen_at = utc_now()
+        user.last_seen_at = now
         data["db_user"] = user
         return await handler(event, data)
 
@@ -73,7 +74,7 @@ class UserContextMiddleware(BaseMiddleware):
     async def _send_not_supported(event: TelegramObject, text: str) -> None:
         if isinstance(event, Message):
             await answer_with_retry(
-                getattr(event, "reply_to_message", event),
+                event.reply_to_message or event,
                 text,
                 parse_mode=None,
             )
@@ -21,7 +21,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.agents.runner import AgentOrchestrator
 from app.bot.utils.messages import iter_fragments
 from app.bot.utils.telegram import answer_with_retry, bot_send_with_retry
-from app.config import get_settings
+from app.config import BotSettings, get_settings
 from app.db.models.core import AgentRun, SubscriptionCard, SubscriptionPlan, User
 from app.i18n import I18nService
 from app.services.conversations import ConversationService
@@ -43,6 +43,7 @@ async def handle_start(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -61,25 +62,24 @@ async def handle_status(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
 
     i18n = I18nService(default_locale=settings.default_language)
     locale = db_user.language_code or settings.default_language
-    subscription_service = SubscriptionService(session)
+    subscription_service = SubscriptionService(session, settings)
     subscription = await subscription_service.get_active_subscription(db_user)
     if subscription is None:
         subscription = await subscription_service.ensure_default_subscription(db_user)
-    hourly_limit = await subscription_service.get_hourly_limit(db_user)
-    limiter = RateLimiter(
-        session,
-        retention_hours=settings.request_limit.window_retention_hours,
-    )
+    # Both lookups above return the subscription with its plan loaded
+    plan = subscription.plan
+    hourly_limit = plan.hourly_message_limit
+    limiter = RateLimiter(session)
     quota = await limiter.get_current_usage(db_user)
     hourly_used = quota.message_count if quota else 0
-    plan = subscription.plan or await session.get(SubscriptionPlan, subscription.plan_id)
-    plan_name = plan.name if plan else "Unknown"
+    plan_name = plan.name
     expires_at = subscription.expires_at
     if expires_at:
         expires_display = (
@@ -112,6 +112,7 @@ async def handle_help(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -127,6 +128,7 @@ async def handle_activate(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -143,7 +145,7 @@ async def handle_activate(
 
     code = parts[1].strip()
     logger.info("activate_card_attempt", user_id=db_user.id, code=code)
-    service = SubscriptionService(session)
+    service = SubscriptionService(session, settings)
     try:
         subscription = await service.redeem_card(db_user, code)
         logger.info(
@@ -176,16 +178,6 @@ async def handle_activate(
         )
         return
 
-    # Refresh subscription to get latest state
-    try:
-        await session.refresh(subscription)
-    except Exception as e:
-        logger.warning(
-            "activate_refresh_failed",
-            subscription_id=getattr(subscription, "id", None),
-            error=str(e),
-        )
-
     # Validate subscription has expires_at
     if subscription.expires_at is None:
         logger.error(
@@ -201,8 +193,8 @@ async def handle_activate(
         )
         return
 
-    # Get plan info and send success message
-    plan = await session.get(SubscriptionPlan, subscription.plan_id)
+    # redeem_card returns the subscription with its plan attached
+    plan = subscription.plan
     plan_name = plan.name if plan else "Pro"
     logger.info(
         "activate_card_success",
@@ -227,6 +219,7 @@ async def handle_issue_card(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if settings.admin_telegram_id is None or message.from_user is None:
         return
@@ -287,6 +280,7 @@ async def handle_announce(
     message: Message,
     session: AsyncSession,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if settings.admin_telegram_id is None or message.from_user is None:
         return
@@ -334,6 +328,7 @@ async def handle_new_conversation(
     session: AsyncSession,
     agent: AgentOrchestrator,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -374,6 +369,7 @@ async def handle_chat(
     session: AsyncSession,
     agent: AgentOrchestrator,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -384,6 +380,7 @@ async def handle_chat(
         agent=agent,
         db_user=db_user,
         user_text=user_text,
+        settings=settings,
     )
 
 
@@ -393,6 +390,7 @@ async def handle_reaction(
     session: AsyncSession,
     agent: AgentOrchestrator,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
@@ -408,6 +406,7 @@ async def handle_reaction(
         agent=agent,
         db_user=db_user,
         user_text=reaction_text,
+        settings=settings,
     )
 
 
@@ -418,17 +417,18 @@ async def _process_user_prompt(
     agent: AgentOrchestrator,
     db_user: User,
     user_text: str,
+    settings: BotSettings,
 ) -> None:
     conversation_service = ConversationService(session)
     memory_service = MemoryService(session)
     i18n = I18nService(default_locale=settings.default_language)
     locale = db_user.language_code or settings.default_language
-    subscription_service = SubscriptionService(session)
+    subscription_service = SubscriptionService(session, settings)
     subscription = await subscription_service.get_active_subscription(db_user)
     if subscription is None:
         subscription = await subscription_service.ensure_default_subscription(db_user)
-    plan = subscription.plan or await session.get(SubscriptionPlan, subscription.plan_id)
-    subscription_level = (plan.code if plan and plan.code else (plan.name if plan else "unknown")).lower()
+    plan = subscription.plan
+    subscription_level = (plan.code or plan.name).lower()
     user_profile = {
         "username": db_user.username or "",
         "first_name": db_user.first_name or "",
@@ -593,7 +593,9 @@ async def _handle_non_text(
     message: Message,
     session: AsyncSession,
     db_user: User | None,
+    *,
     kind: str,
+    settings: BotSettings,
 ) -> None:
     if db_user is None:
         return
@@ -674,17 +676,18 @@ async def handle_photo(
     agent: AgentOrchestrator,
     media_caption_service: MediaCaptionService | None = None,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
     if media_caption_service is None:
-        await _handle_non_text(message, session, db_user, kind="photo")
+        await _handle_non_text(message, session, db_user, kind="photo", settings=settings)
         return
     try:
         description = await media_caption_service.describe_photo(message)
     except MediaCaptionError as exc:
         logger.info("media_caption_failed", kind="photo", error=str(exc))
-        await _handle_non_text(message, session, db_user, kind="photo")
+        await _handle_non_text(message, session, db_user, kind="photo", settings=settings)
         return
     user_text = _compose_media_user_input_text(message, kind="photo", description=description)
     await _process_user_prompt(
@@ -693,23 +696,39 @@ async def handle_photo(
         agent=agent,
         db_user=db_user,
         user_text=user_text,
+        settings=settings,
     )
 
 
 @router.message(F.document)
-async def handle_document(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="document")
+async def handle_document(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="document", settings=settings)
 
 
 @router.message(F.video)
-async def handle_video(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="video")
+async def handle_video(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="video", settings=settings)
 
 
 @router.message(F.voice)
 @router.message(F.audio)
-async def handle_audio(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="audio")
+async def handle_audio(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="audio", settings=settings)
 
 
 @router.message(F.sticker)
@@ -719,17 +738,18 @@ async def handle_sticker(
     agent: AgentOrchestrator,
     media_caption_service: MediaCaptionService | None = None,
     db_user: User | None = None,
+    settings: BotSettings = settings,
 ) -> None:
     if db_user is None:
         return
     if media_caption_service is None:
-        await _handle_non_text(message, session, db_user, kind="sticker")
+        await _handle_non_text(message, session, db_user, kind="sticker", settings=settings)
         return
     try:
         description = await media_caption_service.describe_sticker(message)
     except MediaCaptionError as exc:
         logger.info("media_caption_failed", kind="sticker", error=str(exc))
-        await _handle_non_text(message, session, db_user, kind="sticker")
+        await _handle_non_text(message, session, db_user, kind="sticker", settings=settings)
         return
     user_text = _compose_media_user_input_text(message, kind="sticker", description=description)
     await _process_user_prompt(
@@ -738,29 +758,55 @@ async def handle_sticker(
         agent=agent,
         db_user=db_user,
         user_text=user_text,
+        settings=settings,
     )
 
 
 @router.message(F.animation)
-async def handle_animation(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="animation")
+async def handle_animation(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="animation", settings=settings)
 
 
 @router.message(F.location)
-async def handle_location(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="location")
+async def handle_location(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="location", settings=settings)
 
 
 @router.message(F.contact)
-async def handle_contact(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="contact")
+async def handle_contact(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="contact", settings=settings)
 
 
 @router.message(F.poll)
-async def handle_poll(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="poll")
+async def handle_poll(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="poll", settings=settings)
 
 
 @router.message(F.game)
-async def handle_game(message: Message, session: AsyncSession, db_user: User | None = None) -> None:
-    await _handle_non_text(message, session, db_user, kind="game")
+async def handle_game(
+    message: Message,
+    session: AsyncSession,
+    db_user: User | None = None,
+    settings: BotSettings = settings,
+) -> None:
+    await _handle_non_text(message, session, db_user, kind="game", settings=settings)
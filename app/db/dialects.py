@@ -0,0 +1,73 @@
+"""Dialect-aware statement helpers.
+
+Production runs on MySQL while the test-suite uses SQLite, so statements that
+rely on vendor-specific syntax (upserts) are built here in one place.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+from sqlalchemy import Insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_name(session: AsyncSession) -> str:
+    """Return the SQL dialect name (``mysql``, ``sqlite``, ...) bound to ``session``."""
+
+    return session.get_bind().dialect.name
+
+
+def build_upsert(
+    dialect: str,
+    model: type,
+    rows: Sequence[Mapping[str, Any]] | None = None,
+    *,
+    conflict_columns: Iterable[str],
+    update_columns: Iterable[str] = (),
+    increment_columns: Iterable[str] = (),
+) -> Insert:
+    """Build ``INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE`` for ``model``.
+
+    Conflicting rows take the incoming value for every column in
+    ``update_columns`` and add the incoming value to every column in
+    ``increment_columns``; with neither, conflicting rows are left as they are.
+    ``conflict_columns`` must be covered by a unique key.
+    When ``rows`` is omitted the statement is returned without ``VALUES`` so it
+    can be executed with bound parameters (including ``executemany``).
+    """
+
+    table = model.__table__
+
+    def _assignments(incoming) -> dict[str, Any]:
+        assignments: dict[str, Any] = {
+            column: table.c[column] + incoming[column] for column in increment_columns
+        }
+        assignments.update({column: incoming[column] for column in update_columns})
+        return assignments
+
+    conflict_columns = list(conflict_columns)
+    if dialect == "mysql":
+        stmt = mysql.insert(model)
+        if rows is not None:
+            stmt = stmt.values(list(rows))
+        # MySQL has no DO NOTHING; a self-assignment leaves the row untouched.
+        assignments = _assignments(stmt.inserted) or {
+            conflict_columns[0]: table.c[conflict_columns[0]]
+        }
+        return stmt.on_duplicate_key_update(assignments)
+    if dialect in {"sqlite", "postgresql"}:
+        module = sqlite if dialect == "sqlite" else postgresql
+        stmt = module.insert(model)
+        if rows is not None:
+            stmt = stmt.values(list(rows))
+        assignments = _assignments(stmt.excluded)
+        if not assignments:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=assignments)
+    raise NotImplementedError(f"Upsert is not supported for dialect {dialect!r}")
+
+
+__all__ = ["build_upsert", "dialect_name"]
@@ -8,6 +8,7 @@ from typing import Annotated
 from sqlalchemy import (
     JSON,
     BigInteger,
+    Computed,
     DateTime,
     Enum,
     ForeignKey,
@@ -28,7 +29,10 @@ timestamp = Annotated[datetime, mapped_column(UTCDateTime, default=utc_now)]
 
 class SubscriptionPlan(Base):
     __tablename__ = "subscription_plans"
-    __table_args__ = (UniqueConstraint("code", name="uq_subscription_plans_code"),)
+    __table_args__ = (
+        UniqueConstraint("code", name="uq_subscription_plans_code"),
+        UniqueConstraint("default_slot", name="uq_subscription_plans_default"),
+    )
 
     code: Mapped[str] = mapped_column(String(32), nullable=False)
     name: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -39,6 +43,11 @@ class SubscriptionPlan(Base):
     is_default: Mapped[bool] = mapped_column(default=False)
     features: Mapped[dict | None] = mapped_column(JSON)
     is_active: Mapped[bool] = mapped_column(default=True)
+    # 1 for the active default plan, NULL otherwise; the unique key allows one such row.
+    default_slot: Mapped[int | None] = mapped_column(
+        SmallInteger,
+        Computed("CASE WHEN is_default = 1 AND is_active = 1 THEN 1 END", persisted=True),
+    )
     created_at: Mapped[datetime] = mapped_column(default=utc_now)
     updated_at: Mapped[datetime] = mapped_column(
         default=utc_now, onupdate=utc_now
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 from collections.abc import AsyncIterator, Callable
 from contextlib import asynccontextmanager
 
@@ -10,6 +11,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from app.config import BotSettings, get_settings
 from app.logging import logger
 
+POOL_MONITOR_INTERVAL_SECONDS = 30.0
+
 
 class Database:
     """Lazy SQLAlchemy engine/session factory wrapper."""
@@ -27,8 +30,10 @@ class Database:
                 echo=db_cfg.echo,
                 pool_size=db_cfg.pool_size,
                 max_overflow=db_cfg.max_overflow,
+                pool_timeout=db_cfg.pool_timeout,
                 pool_recycle=db_cfg.pool_recycle,
                 pool_pre_ping=db_cfg.pool_pre_ping,
+                query_cache_size=db_cfg.query_cache_size,
             )
             self._session_factory = async_sessionmaker(
                 bind=self._engine,
@@ -43,6 +48,23 @@ class Database:
         assert self._session_factory is not None
         return self._session_factory
 
+    async def monitor_pool(self, interval_seconds: float = POOL_MONITOR_INTERVAL_SECONDS) -> None:
+        """Sample pool checkouts; warn whenever a sample finds the base pool exhausted."""
+
+        self._ensure_engine()
+        pool = self._engine.pool
+        db_cfg = self.settings.database
+        while True:
+            await asyncio.sleep(interval_seconds)
+            checked_out = pool.checkedout()
+            if checked_out >= db_cfg.pool_size:
+                logger.warning(
+                    "db_pool_saturated",
+                    checked_out=checked_out,
+                    pool_size=db_cfg.pool_size,
+                    max_overflow=db_cfg.max_overflow,
+                )
+
     @asynccontextmanager
     async def session(self) -> AsyncIterator[AsyncSession]:
         factory = self.session_factory
@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
-import json
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import orjson
+
+
+class _SafeDict(dict):
+    """Format mapping that leaves unknown placeholders in the text as ``{name}``."""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
 
 class I18nService:
     def __init__(self, *, locales_path: str | Path | None = None, default_locale: str = "en") -> None:
@@ -15,24 +23,33 @@ class I18nService:
 
     def gettext(self, key: str, *, locale: str | None = None, **kwargs: Any) -> str:
         loc = (locale or self.default_locale).lower()
-        text = self._lookup(loc, key)
-        if text is None and loc != self.default_locale:
-            text = self._lookup(self.default_locale, key)
-        if text is None:
-            text = key
-        return text.format(**kwargs) if kwargs else text
-
-    @lru_cache(maxsize=16)
-    def _load_locale(self, locale: str) -> dict[str, str]:
-        file_path = self.locales_path / f"{locale}.json"
-        if not file_path.exists():
-            return {}
-        with file_path.open("r", encoding="utf-8") as fp:
-            return json.load(fp)
-
-    def _lookup(self, locale: str, key: str) -> str | None:
-        table = self._load_locale(locale)
-        return table.get(key)
+        text = _resolve(self.locales_path, self.default_locale, loc, key)
+        return text.format_map(_SafeDict(kwargs)) if kwargs else text
+
+
+# Handlers build a fresh I18nService per update, so the caches live at module
+# level keyed by the locales directory rather than on the instance.
+@lru_cache(maxsize=4)
+def _load_catalog(locales_path: Path) -> dict[tuple[str, str], str]:
+    """Every ``<locale>.json`` under ``locales_path`` flattened to ``(locale, key)``."""
+
+    catalog: dict[tuple[str, str], str] = {}
+    for file_path in sorted(locales_path.glob("*.json")):
+        locale = file_path.stem.lower()
+        table = orjson.loads(file_path.read_bytes())
+        catalog.update(((locale, key), text) for key, text in table.items())
+    return catalog
+
+
+@lru_cache(maxsize=1024)
+def _resolve(locales_path: Path, default_locale: str, locale: str, key: str) -> str:
+    """Template for ``key``: requested locale, then the default, then the key itself."""
+
+    catalog = _load_catalog(locales_path)
+    text = catalog.get((locale, key))
+    if text is None:
+        text = catalog.get((default_locale.lower(), key), key)
+    return text
 
 
 __all__ = ["I18nService"]
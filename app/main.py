@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -22,6 +23,7 @@ from app.db.session import Database
 from app.logging import configure_logging, logger
 from app.services.error_monitor import ErrorMonitor
 from app.services.media_caption import MediaCaptionService
+from app.services.rate_limit import run_window_sweeper
 from app.services.seeds import ensure_subscription_plans
 
 
@@ -69,8 +71,31 @@ async def main() -> None:
     agent = AgentOrchestrator(settings=settings)
     media_caption_service = MediaCaptionService(settings=settings)
 
+    # Housekeeping (quota window sweep, pool sampling) runs off the request path
+    background_tasks = [
+        asyncio.create_task(
+            run_window_sweeper(
+                database.session,
+                settings.request_limit.window_retention_hours,
+            )
+        ),
+        asyncio.create_task(database.monitor_pool()),
+    ]
+
     logger.info("bot_starting", environment=settings.environment)
-    await dp.start_polling(bot, agent=agent, media_caption_service=media_caption_service)
+    try:
+        await dp.start_polling(
+            bot,
+            agent=agent,
+            media_caption_service=media_caption_service,
+            settings=settings,
+        )
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        for task in background_tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
 
 
 if __name__ == "__main__":
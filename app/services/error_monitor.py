@@ -19,6 +19,17 @@ TELEGRAM_MESSAGE_LIMIT = 3900
 TRACEBACK_CHAR_LIMIT = 1800
 PAYLOAD_CHAR_LIMIT = 1200
 
+_HEADER_TEMPLATE = (
+    "BOT ERROR DETECTED\n"
+    "Environment: {environment}\n"
+    "Exception: {exception_type}: {exception}\n"
+    "Update ID: {update_id}\n"
+    "Update Type: {update_type}\n"
+    "User: {user}\n"
+    "Chat: {chat}"
+)
+_SECTION_TEMPLATE = "\n\n{title}:\n{body}"
+
 
 class ErrorMonitor:
     """Async callable plugged into aiogram error observer."""
@@ -59,21 +70,20 @@ class ErrorMonitor:
         user_summary, chat_summary = self._describe_actor(update)
         traceback_text = self._format_traceback(exception)
 
-        lines = [
-            "BOT ERROR DETECTED",
-            f"Environment: {self._settings.environment}",
-            f"Exception: {exception.__class__.__name__}: {exception}",
-            f"Update ID: {getattr(update, 'update_id', 'unknown')}",
-            f"Update Type: {update_type}",
-            f"User: {user_summary}",
-            f"Chat: {chat_summary}",
-        ]
+        text = _HEADER_TEMPLATE.format(
+            environment=self._settings.environment,
+            exception_type=exception.__class__.__name__,
+            exception=exception,
+            update_id=getattr(update, "update_id", "unknown"),
+            update_type=update_type,
+            user=user_summary,
+            chat=chat_summary,
+        )
         if traceback_text:
-            lines.extend(["", "Traceback:", traceback_text])
+            text += _SECTION_TEMPLATE.format(title="Traceback", body=traceback_text)
         if payload_preview:
-            lines.extend(["", "Payload:", payload_preview])
-
-        text = "\n".join(lines).strip()
+            text += _SECTION_TEMPLATE.format(title="Payload", body=payload_preview)
+        text = text.strip()
         if len(text) > TELEGRAM_MESSAGE_LIMIT:
             text = f"{text[:TELEGRAM_MESSAGE_LIMIT - 15].rstrip()}\n...[truncated]"
         return text
@@ -5,7 +5,7 @@ from __future__ import annotations
 import base64
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Awaitable, Callable, Sequence, TypeVar
+from typing import Any, Awaitable, Callable, Iterable, Sequence, TypeVar
 from urllib.parse import quote
 
 import httpx
@@ -54,11 +54,21 @@ class _BaseToolService:
             operation,
             max_attempts=3,
             base_delay=0.5,
+            retryable=_is_transient_http_error,
             logger=logger,
             operation_name=name,
         )
 
 
+def _is_transient_http_error(exc: BaseException) -> bool:
+    """Retry transport failures, 429 and 5xx; other HTTP statuses are permanent."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code if exc.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.RequestError)
+
+
 class SearchService(_BaseToolService):
     """Encapsulates search provider integration (SerpApi, placeholder web search)."""
 
@@ -273,8 +283,7 @@ class MarketDataService(_BaseToolService):
         if not isinstance(payload, dict) or not payload:
             raise ToolServiceError("Market data provider returned no data.")
 
-        records = [self._normalize_record(symbol, info) for symbol, info in payload.items()]
-        matches, matched_token_set = self._filter_records(records, normalized_tokens)
+        matches, matched_token_set = self._filter_records(payload, normalized_tokens)
         unmatched = [token for token in normalized_tokens if token not in matched_token_set]
 
         limit_value = self._normalize_limit(limit)
@@ -282,7 +291,7 @@ class MarketDataService(_BaseToolService):
         truncated = total_matches > limit_value
         limited_items = matches[:limit_value]
 
-        as_of_iso = self._compute_as_of(records)
+        as_of_iso = self._compute_as_of(payload.values())
 
         return MarketSnapshotResult(
             as_of=as_of_iso,
@@ -328,19 +337,27 @@ class MarketDataService(_BaseToolService):
         return data
 
     def _filter_records(
-        self, records: Sequence[dict[str, Any]], tokens: Sequence[str]
+        self, payload: dict[str, Any], tokens: Sequence[str]
     ) -> tuple[list[dict[str, Any]], set[str]]:
+        """Score raw snapshot entries against ``tokens``; only matches are normalized.
+
+        A snapshot covers every listed symbol while a query names a handful, so
+        matching runs on the raw ``symbol``/``name`` fields and the full record
+        normalization is paid only for entries that are returned.
+        """
+
         matches: list[dict[str, Any]] = []
         matched_tokens: set[str] = set()
-        if not records:
+        if not payload:
             return matches, matched_tokens
 
         prepared_tokens = [(token, token.lower()) for token in tokens]
 
         decorated: list[tuple[int, int, int, dict[str, Any]]] = []
-        for record in records:
-            symbol = (record.get("symbol") or "").lower()
-            name = (record.get("name") or "").lower()
+        for raw_symbol, info in payload.items():
+            info = info or {}
+            symbol = str(info.get("symbol") or raw_symbol).lower()
+            name = str(info.get("name") or raw_symbol).lower()
             best_score = 0
             earliest_idx = len(prepared_tokens)
             matched_for_record: list[str] = []
@@ -352,7 +369,7 @@ class MarketDataService(_BaseToolService):
                     matched_for_record.append(original)
                     matched_tokens.add(original)
             if matched_for_record:
-                record_with_tokens = dict(record)
+                record_with_tokens = self._normalize_record(raw_symbol, info)
                 record_with_tokens["matched_tokens"] = matched_for_record
                 decorated.append(
                     (
@@ -410,17 +427,12 @@ class MarketDataService(_BaseToolService):
         except (TypeError, ValueError):
             return None
 
-    def _compute_as_of(self, records: Sequence[dict[str, Any]]) -> str:
+    def _compute_as_of(self, entries: Iterable[dict[str, Any] | None]) -> str:
         timestamps: list[int] = []
-        for record in records:
-            raw_ts = record.get("collection_timestamp")
-            if isinstance(raw_ts, int):
+        for entry in entries:
+            raw_ts = self._to_int((entry or {}).get("collection_timestamp"))
+            if raw_ts is not None:
                 timestamps.append(raw_ts)
-            else:
-                try:
-                    timestamps.append(int(raw_ts))
-                except (TypeError, ValueError):
-                    continue
         if timestamps:
             latest = max(timestamps)
             return datetime.fromtimestamp(latest, tz=timezone.utc).isoformat().replace("+00:00", "Z")
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
-from sqlalchemy import select
+from collections.abc import AsyncIterator
+
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models.core import LongTermMemory, MemoryChunk, Message
 
+MEMORY_STREAM_PARTITION = 100
+
 
 class MemoryService:
     def __init__(self, session: AsyncSession) -> None:
@@ -15,14 +19,31 @@ class MemoryService:
     async def fetch_relevant_memories(
         self, user_id: int, *, limit: int = 5
     ) -> list[LongTermMemory]:
-        stmt = (
+        """Most recently updated active memories for ``user_id``."""
+
+        result = await self.session.execute(self._relevant_memories_stmt(user_id, limit))
+        return list(result.scalars().all())
+
+    async def iter_relevant_memories(
+        self, user_id: int, *, limit: int = 5
+    ) -> AsyncIterator[LongTermMemory]:
+        """Stream the same rows as ``fetch_relevant_memories`` without building a list."""
+
+        stmt = self._relevant_memories_stmt(user_id, limit).execution_options(
+            yield_per=MEMORY_STREAM_PARTITION
+        )
+        result = await self.session.stream_scalars(stmt)
+        async for memory in result:
+            yield memory
+
+    @staticmethod
+    def _relevant_memories_stmt(user_id: int, limit: int) -> Select:
+        return (
             select(LongTermMemory)
             .where(LongTermMemory.user_id == user_id, LongTermMemory.is_active.is_(True))
             .order_by(LongTermMemory.updated_at.desc())
             .limit(limit)
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
 
     async def create_memory(
         self,
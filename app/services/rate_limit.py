@@ -2,29 +2,103 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
 from datetime import datetime, timedelta
+from functools import cache
 
-from sqlalchemy import delete, select
+from sqlalchemy import Insert, bindparam, delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.dialects import build_upsert, dialect_name
 from app.db.models.core import UsageHourlyQuota, User
+from app.logging import logger
 from app.services.exceptions import RateLimitExceeded
 from app.utils.datetime import utc_now
 
+SWEEP_INTERVAL_SECONDS = 3600
+
+_window_cache: datetime | None = None
+
 
 def _current_window_start(now: datetime) -> datetime:
-    return now.replace(minute=0, second=0, microsecond=0)
+    """Truncate ``now`` to the hour in its own timezone, reusing the last result.
+
+    The cached window is returned while ``now`` falls in the same wall-clock hour
+    with the same ``tzinfo``, so repeated calls allocate nothing.
+    """
+
+    global _window_cache
+    cached = _window_cache
+    if (
+        cached is not None
+        and cached.hour == now.hour
+        and cached.day == now.day
+        and cached.month == now.month
+        and cached.year == now.year
+        and cached.tzinfo is now.tzinfo
+    ):
+        return cached
+    window_start = now.replace(minute=0, second=0, microsecond=0)
+    _window_cache = window_start
+    return window_start
+
+
+# Users known to have exhausted their quota in the current window, mapped to the
+# limit they hit. Counters only grow within a window, so a repeat hit with the
+# same limit can be rejected without touching the database.
+_exhausted: tuple[datetime | None, dict[int, int]] = (None, {})
+
+
+def _is_known_exhausted(user_id: int, window_start: datetime, hourly_limit: int) -> bool:
+    window, users = _exhausted
+    return window == window_start and users.get(user_id) == hourly_limit
+
+
+def _remember_exhausted(user_id: int, window_start: datetime, hourly_limit: int) -> None:
+    global _exhausted
+    if _exhausted[0] != window_start:
+        _exhausted = (window_start, {})
+    _exhausted[1][user_id] = hourly_limit
+
+
+_QUOTA_CONSUME = (
+    update(UsageHourlyQuota)
+    .where(
+        UsageHourlyQuota.user_id == bindparam("quota_user_id"),
+        UsageHourlyQuota.window_start == bindparam("quota_window_start"),
+        UsageHourlyQuota.message_count + bindparam("messages") <= bindparam("hourly_limit"),
+    )
+    .values(
+        message_count=UsageHourlyQuota.message_count + bindparam("messages"),
+        tool_call_count=UsageHourlyQuota.tool_call_count + bindparam("tools"),
+        updated_at=bindparam("now"),
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+@cache
+def _open_window(dialect: str) -> Insert:
+    """Per-dialect "insert the window row unless it exists", built once."""
+
+    return build_upsert(
+        dialect,
+        UsageHourlyQuota,
+        conflict_columns=("user_id", "window_start"),
+    )
 
 
 class RateLimiter:
-    def __init__(self, session: AsyncSession, retention_hours: int | None = None) -> None:
+    def __init__(
+        self, session: AsyncSession, *, clock: Callable[[], datetime] = utc_now
+    ) -> None:
         self.session = session
-        self.retention_delta = (
-            timedelta(hours=retention_hours) if retention_hours and retention_hours > 0 else None
-        )
+        self._clock = clock
 
     async def get_current_usage(self, user: User) -> UsageHourlyQuota | None:
-        window_start = _current_window_start(utc_now())
+        window_start = _current_window_start(self._clock())
         stmt = select(UsageHourlyQuota).where(
             UsageHourlyQuota.user_id == user.id,
             UsageHourlyQuota.window_start == window_start,
@@ -39,48 +113,78 @@ class RateLimiter:
         *,
         increment_messages: int = 1,
         increment_tools: int = 0,
-    ) -> UsageHourlyQuota:
-        now = utc_now()
+    ) -> None:
+        now = self._clock()
         window_start = _current_window_start(now)
 
-        stmt = (
-            select(UsageHourlyQuota)
-            .where(
-                UsageHourlyQuota.user_id == user.id,
-                UsageHourlyQuota.window_start == window_start,
-            )
-            .with_for_update()
-        )
-        result = await self.session.execute(stmt)
-        quota = result.scalar_one_or_none()
-        if quota is None:
-            await self._cleanup_old_windows(user.id, window_start)
-            quota = UsageHourlyQuota(
-                user_id=user.id,
-                window_start=window_start,
-                message_count=0,
-                tool_call_count=0,
-                last_reset_at=window_start,
-            )
-            self.session.add(quota)
-
-        if quota.message_count + increment_messages > hourly_limit:
-            raise RateLimitExceeded(
-                f"Hourly limit reached: {quota.message_count}/{hourly_limit}."
-            )
-
-        quota.message_count += increment_messages
-        quota.tool_call_count += increment_tools
-        quota.updated_at = now
-        await self.session.flush()
-        return quota
-
-    async def _cleanup_old_windows(self, user_id: int, window_start: datetime) -> None:
-        if not self.retention_delta:
+        if increment_messages > 0 and _is_known_exhausted(user.id, window_start, hourly_limit):
+            raise RateLimitExceeded(f"Hourly limit of {hourly_limit} messages reached.")
+
+        params = {
+            "quota_user_id": user.id,
+            "quota_window_start": window_start,
+            "messages": increment_messages,
+            "tools": increment_tools,
+            "hourly_limit": hourly_limit,
+            "now": now,
+        }
+        # The guarded UPDATE checks and consumes quota atomically; it only
+        # misses when the window row does not exist yet or the limit is hit.
+        if await self._consume(params):
             return
-        cutoff = window_start - self.retention_delta
-        stmt = delete(UsageHourlyQuota).where(
-            UsageHourlyQuota.user_id == user_id,
-            UsageHourlyQuota.window_start < cutoff,
+
+        await self.session.execute(
+            _open_window(dialect_name(self.session)),
+            {
+                "user_id": user.id,
+                "window_start": window_start,
+                "message_count": 0,
+                "tool_call_count": 0,
+                "last_reset_at": window_start,
+                "created_at": now,
+                "updated_at": now,
+            },
         )
-        await self.session.execute(stmt)
+        if await self._consume(params):
+            return
+        if increment_messages == 1:
+            _remember_exhausted(user.id, window_start, hourly_limit)
+        raise RateLimitExceeded(f"Hourly limit of {hourly_limit} messages reached.")
+
+    async def _consume(self, params: dict[str, object]) -> bool:
+        result = await self.session.execute(_QUOTA_CONSUME, params)
+        return result.rowcount > 0
+
+
+async def sweep_old_windows(session: AsyncSession, retention_delta: timedelta) -> int:
+    """Delete every quota window older than ``retention_delta`` in one statement."""
+
+    cutoff = _current_window_start(utc_now()) - retention_delta
+    result = await session.execute(
+        delete(UsageHourlyQuota).where(UsageHourlyQuota.window_start < cutoff)
+    )
+    return result.rowcount or 0
+
+
+async def run_window_sweeper(
+    session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+    retention_hours: int,
+    *,
+    interval_seconds: float = SWEEP_INTERVAL_SECONDS,
+) -> None:
+    """Periodically purge expired quota windows, off the request path."""
+
+    retention_delta = timedelta(hours=retention_hours)
+    while True:
+        try:
+            async with session_factory() as session:
+                deleted = await sweep_old_windows(session, retention_delta)
+                await session.commit()
+            if deleted:
+                logger.info("quota_windows_swept", deleted=deleted)
+        except Exception as exc:
+            logger.warning("quota_window_sweep_failed", error=str(exc))
+        await asyncio.sleep(interval_seconds)
+
+
+__all__ = ["RateLimiter", "run_window_sweeper", "sweep_old_windows"]
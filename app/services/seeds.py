@@ -2,16 +2,35 @@
 
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import BotSettings
+from app.db.dialects import build_upsert, dialect_name
 from app.db.models.core import SubscriptionPlan
+from app.services.subscriptions import SubscriptionService
 from app.utils.datetime import utc_now
 
+_COMPARED_COLUMNS = (
+    "name",
+    "description",
+    "hourly_message_limit",
+    "monthly_price",
+    "priority",
+    "is_default",
+    "is_active",
+)
+
 
 async def ensure_subscription_plans(session: AsyncSession, settings: BotSettings) -> None:
-    """Ensure default Free/Pro/Max plans exist and stay in sync."""
+    """Ensure default Free/Pro/Max plans exist and stay in sync.
+
+    Current rows are read once and only missing or drifted plans are written,
+    with a single multi-row upsert keyed on ``code``; a restart writes nothing.
+    Any other default plan is demoted first, since ``uq_subscription_plans_default``
+    allows only one active default and MySQL would otherwise resolve the upsert
+    against that key.
+    """
 
     default_plans = (
         {
@@ -52,37 +71,43 @@ async def ensure_subscription_plans(session: AsyncSession, settings: BotSettings
         },
     )
 
+    result = await session.execute(
+        select(SubscriptionPlan.code, *(getattr(SubscriptionPlan, c) for c in _COMPARED_COLUMNS))
+    )
+    current = {row[0]: tuple(row[1:]) for row in result}
+
+    now = utc_now()
+    default_code = next(plan["code"] for plan in default_plans if plan["is_default"])
+    is_default_index = _COMPARED_COLUMNS.index("is_default")
+    demote = any(
+        values[is_default_index] and code != default_code for code, values in current.items()
+    )
+    if demote:
+        await session.execute(
+            update(SubscriptionPlan)
+            .where(SubscriptionPlan.is_default.is_(True), SubscriptionPlan.code != default_code)
+            .values(is_default=False, updated_at=now)
+        )
+
+    rows = []
     for payload in default_plans:
-        stmt = select(SubscriptionPlan).where(SubscriptionPlan.code == payload["code"])
-        result = await session.execute(stmt)
-        plan = result.scalar_one_or_none()
-        now = utc_now()
-        if plan:
-            plan.name = payload["name"]
-            plan.description = payload["description"]
-            plan.hourly_message_limit = payload["hourly_message_limit"]
-            plan.monthly_price = payload["monthly_price"]
-            plan.priority = payload["priority"]
-            plan.is_default = payload["is_default"]
-            plan.is_active = True
-            plan.updated_at = now
-        else:
-            session.add(
-                SubscriptionPlan(
-                    code=payload["code"],
-                    name=payload["name"],
-                    description=payload["description"],
-                    hourly_message_limit=payload["hourly_message_limit"],
-                    monthly_price=payload["monthly_price"],
-                    priority=payload["priority"],
-                    is_default=payload["is_default"],
-                    is_active=True,
-                    created_at=now,
-                    updated_at=now,
-                )
-            )
+        desired = {**payload, "is_active": True}
+        if current.get(payload["code"]) == tuple(desired[c] for c in _COMPARED_COLUMNS):
+            continue
+        rows.append({**desired, "created_at": now, "updated_at": now})
 
+    if rows:
+        stmt = build_upsert(
+            dialect_name(session),
+            SubscriptionPlan,
+            rows,
+            conflict_columns=("code",),
+            update_columns=(*_COMPARED_COLUMNS, "updated_at"),
+        )
+        await session.execute(stmt)
     await session.commit()
+    if rows or demote:
+        SubscriptionService.invalidate_default_plan()
 
 
 __all__ = ["ensure_subscription_plans"]
@@ -2,19 +2,88 @@
 
 from __future__ import annotations
 
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Sequence
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Sequence
 
-from sqlalchemy import and_, or_, select
+from sqlalchemy import and_, bindparam, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.config import BotSettings, get_settings
+from app.db.dialects import dialect_name
 from app.db.models.core import SubscriptionCard, SubscriptionPlan, User, UserSubscription
+from app.logging import logger
 from app.services.exceptions import CardNotFound
 from app.utils.datetime import utc_now
 
-ACTIVE_STATUSES = {"active", "pending"}
+ACTIVE_STATUSES = ("active", "pending")
+DEFAULT_PLAN_TTL_SECONDS = 60.0
+_NO_TIME = timedelta(0)
+
+
+@dataclass(frozen=True, slots=True)
+class DefaultPlanSnapshot:
+    """Session-independent copy of the default plan's identifying fields."""
+
+    id: int
+    priority: int
+    hourly_message_limit: int
+
+
+_default_plan_cache: tuple[float, DefaultPlanSnapshot | None] = (0.0, None)
+
+
+@lru_cache(maxsize=32)
+def _days(count: int) -> timedelta:
+    """Return a shared ``timedelta`` for card durations (only a few distinct values)."""
+
+    return timedelta(days=count)
+
+
+# Hot statements are built once; values are supplied as bound parameters so the
+# compiled form is reused from SQLAlchemy's statement cache.
+_ACTIVE_SUBSCRIPTION_STMT = (
+    select(UserSubscription)
+    .options(joinedload(UserSubscription.plan))
+    .where(
+        UserSubscription.user_id == bindparam("user_id"),
+        UserSubscription.status == "active",
+        or_(
+            UserSubscription.expires_at.is_(None),
+            UserSubscription.expires_at > bindparam("now"),
+        ),
+    )
+    .order_by(UserSubscription.priority.desc(), UserSubscription.expires_at.desc())
+    .limit(1)
+)
+_DEFAULT_SUBSCRIPTION_STMT = (
+    select(UserSubscription)
+    .options(joinedload(UserSubscription.plan))
+    .where(
+        UserSubscription.user_id == bindparam("user_id"),
+        UserSubscription.plan_id == bindparam("plan_id"),
+    )
+)
+_EXISTING_SUBSCRIPTIONS_STMT = (
+    select(UserSubscription)
+    .where(
+        UserSubscription.user_id == bindparam("user_id"),
+        UserSubscription.status.in_(bindparam("active_statuses", expanding=True)),
+    )
+)
+_LOCKED_EXISTING_SUBSCRIPTIONS_STMT = _EXISTING_SUBSCRIPTIONS_STMT.with_for_update()
+# Dialects that honour ``SELECT ... FOR UPDATE``; SQLite has no row locks.
+_ROW_LOCK_DIALECTS = frozenset({"mysql", "mariadb", "postgresql"})
+# db/schema.sql allows at most one active default plan (uq_subscription_plans_default).
+_DEFAULT_PLAN_STMT = select(SubscriptionPlan).where(
+    SubscriptionPlan.is_default.is_(True),
+    SubscriptionPlan.is_active.is_(True),
+)
 
 
 class SubscriptionService:
@@ -22,55 +91,46 @@ class SubscriptionService:
         self.session = session
         self.settings = settings or get_settings()
 
-    async def get_active_subscription(self, user: User) -> UserSubscription | None:
-        now = utc_now()
-        stmt = (
-            select(UserSubscription)
-            .options(selectinload(UserSubscription.plan))
-            .where(
-                and_(
-                    UserSubscription.user_id == user.id,
-                    UserSubscription.status == "active",
-                    or_(
-                        UserSubscription.expires_at.is_(None),
-                        UserSubscription.expires_at > now,
-                    ),
-                )
-            )
-            .order_by(UserSubscription.priority.desc(), UserSubscription.expires_at.desc())
+    async def get_active_subscription(
+        self, user: User, *, now: datetime | None = None
+    ) -> UserSubscription | None:
+        result = await self.session.execute(
+            _ACTIVE_SUBSCRIPTION_STMT,
+            {"user_id": user.id, "now": now or utc_now()},
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.scalar_one_or_none()
 
     async def get_hourly_limit(self, user: User) -> int:
-        subscription = await self.get_active_subscription(user)
+        now = utc_now()
+        subscription = await self.get_active_subscription(user, now=now)
         if not subscription:
-            subscription = await self.ensure_default_subscription(user)
-        plan = subscription.plan
-        if plan is None:
-            plan = await self.session.get(SubscriptionPlan, subscription.plan_id)
-        if plan:
-            return plan.hourly_message_limit
-        raise RuntimeError("No default subscription plan configured.")
+            subscription = await self.ensure_default_subscription(user, now=now)
+        # Both paths above populate ``plan``, so no extra lookup is needed.
+        return subscription.plan.hourly_message_limit
 
-    async def ensure_default_subscription(self, user: User) -> UserSubscription:
+    async def ensure_default_subscription(
+        self, user: User, *, now: datetime | None = None
+    ) -> UserSubscription:
         """Make sure the user always has an active default plan record."""
 
+        now = now or utc_now()
         default_plan = await self._get_default_plan()
         if default_plan is None:
             raise RuntimeError("No default subscription plan configured.")
 
-        stmt = select(UserSubscription).where(
-            UserSubscription.user_id == user.id,
-            UserSubscription.plan_id == default_plan.id,
+        result = await self.session.execute(
+            _DEFAULT_SUBSCRIPTION_STMT,
+            {"user_id": user.id, "plan_id": default_plan.id},
         )
-        result = await self.session.execute(stmt)
         subscription = result.scalar_one_or_none()
-        now = utc_now()
         if subscription is None:
+            plan = await self.session.get(SubscriptionPlan, default_plan.id)
+            if plan is None:
+                self.invalidate_default_plan()
+                raise RuntimeError("No default subscription plan configured.")
             subscription = UserSubscription(
                 user_id=user.id,
-                plan_id=default_plan.id,
+                plan_id=plan.id,
                 status="active",
                 priority=default_plan.priority,
                 activated_at=now,
@@ -78,7 +138,7 @@ class SubscriptionService:
                 expires_at=None,
             )
             self.session.add(subscription)
-            subscription.plan = default_plan
+            subscription.plan = plan
         else:
             subscription.priority = default_plan.priority
             if subscription.status != "active":
@@ -86,20 +146,20 @@ class SubscriptionService:
                 subscription.activated_at = subscription.activated_at or now
                 subscription.starts_at = subscription.starts_at or now
             subscription.expires_at = None
-            if subscription.plan is None:
-                subscription.plan = default_plan
 
         await self.session.flush()
         return subscription
 
-    async def redeem_card(self, user: User, code: str) -> UserSubscription:
-        from app.logging import logger
-        
-        now = utc_now()
-        logger.info("redeem_card_start", user_id=user.id, code=code)
-        
+    async def redeem_card(
+        self, user: User, code: str, *, now: datetime | None = None
+    ) -> UserSubscription:
+        now = now or utc_now()
+        lock_rows = dialect_name(self.session) in _ROW_LOCK_DIALECTS
+
+        # The plan is joined into the card lookup; only the card row is locked.
         card_stmt = (
             select(SubscriptionCard)
+            .options(joinedload(SubscriptionCard.plan))
             .where(
                 and_(
                     SubscriptionCard.code == code,
@@ -107,82 +167,79 @@ class SubscriptionService:
                     or_(SubscriptionCard.expires_at.is_(None), SubscriptionCard.expires_at > now),
                 )
             )
-            .with_for_update()
         )
+        if lock_rows:
+            card_stmt = card_stmt.with_for_update(of=SubscriptionCard)
         result = await self.session.execute(card_stmt)
         card = result.scalar_one_or_none()
         if card is None:
             logger.info("redeem_card_not_found", user_id=user.id, code=code)
             raise CardNotFound("Card not found or already redeemed.")
 
-        logger.info(
-            "redeem_card_found",
-            user_id=user.id,
-            card_id=card.id,
-            plan_id=card.plan_id,
-            valid_days=card.valid_days,
-        )
-        
         card.status = "redeemed"
         card.redeemed_by_user_id = user.id
         card.redeemed_at = now
-        plan = await self.session.get(SubscriptionPlan, card.plan_id)
+        plan = card.plan
         if plan is None:
             logger.error("redeem_card_plan_not_found", card_id=card.id, plan_id=card.plan_id)
             raise CardNotFound("Associated plan no longer exists.")
 
-        logger.info("redeem_card_plan_loaded", plan_code=plan.code, plan_name=plan.name)
-        
-        subs_stmt = (
-            select(UserSubscription)
-            .where(
-                and_(
-                    UserSubscription.user_id == user.id,
-                    UserSubscription.status.in_(ACTIVE_STATUSES),
-                )
-            )
-            .with_for_update()
+        subs_result = await self.session.execute(
+            _LOCKED_EXISTING_SUBSCRIPTIONS_STMT if lock_rows else _EXISTING_SUBSCRIPTIONS_STMT,
+            {"user_id": user.id, "active_statuses": list(ACTIVE_STATUSES)},
         )
-        existing_subs = list((await self.session.execute(subs_stmt)).scalars())
-        logger.info("redeem_card_existing_subs", count=len(existing_subs))
+        existing_subs = list(subs_result.scalars())
+        same_plan, blockers, lower = self._partition_subscriptions(existing_subs, plan)
 
         duration_days = card.valid_days or self.settings.subscriptions.subscription_duration_days
-        duration = timedelta(days=duration_days)
-        logger.info("redeem_card_duration", days=duration_days)
-
-        stacked = self._extend_same_plan(existing_subs, plan, duration, now)
-        if stacked:
-            stacked.source_card_id = card.id
-            logger.info(
-                "redeem_card_stacked",
-                subscription_id=stacked.id,
-                expires_at=stacked.expires_at,
-            )
-            await self.session.flush()
-            return stacked
-
-        new_sub = UserSubscription(
+        duration = _days(duration_days)
+        logger.debug(
+            "redeem_card_loaded",
             user_id=user.id,
+            card_id=card.id,
             plan_id=plan.id,
-            source_card_id=card.id,
-            priority=plan.priority,
+            existing=len(existing_subs),
+            days=duration_days,
         )
-        self.session.add(new_sub)
-        self._schedule_new_subscription(new_sub, plan, existing_subs, duration, now)
+
+        subscription = self._extend_same_plan(same_plan, plan, duration, now)
+        stacked = subscription is not None
+        if subscription is not None:
+            subscription.source_card_id = card.id
+        else:
+            subscription = UserSubscription(
+                user_id=user.id,
+                plan_id=plan.id,
+                plan=plan,
+                source_card_id=card.id,
+                priority=plan.priority,
+            )
+            self.session.add(subscription)
+            delayed = self._schedule_new_subscription(
+                subscription, plan, blockers, lower, duration, now
+            )
+            if delayed:
+                # One executemany UPDATE for every pushed-back subscription.
+                await self.session.execute(update(UserSubscription), delayed)
+        await self.session.flush()
         logger.info(
-            "redeem_card_new_subscription",
-            plan_id=new_sub.plan_id,
-            status=new_sub.status,
-            starts_at=new_sub.starts_at,
-            expires_at=new_sub.expires_at,
+            "redeem_card_complete",
+            user_id=user.id,
+            card_id=card.id,
+            plan_id=plan.id,
+            stacked=stacked,
+            status=subscription.status,
+            starts_at=subscription.starts_at,
+            expires_at=subscription.expires_at,
         )
-        await self.session.flush()
-        return new_sub
+        return subscription
 
-    async def expire_outdated_subscriptions(self, user: User) -> None:
+    async def expire_outdated_subscriptions(
+        self, user: User, *, now: datetime | None = None
+    ) -> None:
         """Mark any elapsed active/pending subscriptions as expired."""
 
-        now = utc_now()
+        now = now or utc_now()
         stmt = (
             select(UserSubscription)
             .where(
@@ -200,61 +257,98 @@ class SubscriptionService:
         if changed:
             await self.session.flush()
 
+    @staticmethod
+    def invalidate_default_plan() -> None:
+        """Drop the cached default plan; call after plans are modified."""
+
+        global _default_plan_cache
+        _default_plan_cache = (0.0, None)
+
     # Internal helpers -------------------------------------------------
 
-    async def _get_default_plan(self) -> SubscriptionPlan | None:
-        stmt = (
-            select(SubscriptionPlan)
-            .where(
-                SubscriptionPlan.is_default.is_(True),
-                SubscriptionPlan.is_active.is_(True),
-            )
-            .order_by(SubscriptionPlan.priority.desc())
+    async def _get_default_plan(self) -> DefaultPlanSnapshot | None:
+        global _default_plan_cache
+        cached_at, snapshot = _default_plan_cache
+        if snapshot is not None and time.monotonic() - cached_at < DEFAULT_PLAN_TTL_SECONDS:
+            return snapshot
+
+        result = await self.session.execute(_DEFAULT_PLAN_STMT)
+        plan = result.scalar_one_or_none()
+        if plan is None:
+            return None
+        snapshot = DefaultPlanSnapshot(
+            id=plan.id,
+            priority=plan.priority,
+            hourly_message_limit=plan.hourly_message_limit,
         )
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        _default_plan_cache = (time.monotonic(), snapshot)
+        return snapshot
+
+    @staticmethod
+    def _partition_subscriptions(
+        subscriptions: Sequence[UserSubscription],
+        plan: SubscriptionPlan,
+    ) -> tuple[list[UserSubscription], list[UserSubscription], list[UserSubscription]]:
+        """Split live subscriptions into (same plan, not lower priority, lower priority)."""
+
+        plan_id = plan.id
+        plan_priority = plan.priority
+        same_plan: list[UserSubscription] = []
+        blockers: list[UserSubscription] = []
+        lower: list[UserSubscription] = []
+        for sub in subscriptions:
+            if sub.status not in ACTIVE_STATUSES:
+                continue
+            if sub.plan_id == plan_id:
+                same_plan.append(sub)
+            if sub.priority >= plan_priority:
+                blockers.append(sub)
+            else:
+                lower.append(sub)
+        return same_plan, blockers, lower
 
     def _extend_same_plan(
         self,
-        subscriptions: Sequence[UserSubscription],
+        same_plan: Sequence[UserSubscription],
         plan: SubscriptionPlan,
         duration: timedelta,
         now: datetime,
     ) -> UserSubscription | None:
-        candidates = [
-            sub
-            for sub in subscriptions
-            if sub.plan_id == plan.id and sub.status in ACTIVE_STATUSES
-        ]
-        if not candidates:
+        target: UserSubscription | None = None
+        current_end = now
+        for sub in same_plan:
+            end = sub.expires_at or now
+            if target is None or end > current_end:
+                target, current_end = sub, end
+        if target is None:
             return None
 
-        target = max(candidates, key=lambda sub: sub.expires_at or now)
-        base = target.expires_at if target.expires_at and target.expires_at > now else now
-        target.expires_at = (base or now) + duration
-        if target.starts_at is None:
-            target.starts_at = target.activated_at or now
-        if target.expires_at and target.expires_at > now:
-            target.status = "active" if (target.starts_at or now) <= now else "pending"
+        expires_at = max(current_end, now) + duration
+        starts_at = target.starts_at
+        if starts_at is None:
+            starts_at = target.activated_at or now
+            target.starts_at = starts_at
+        target.expires_at = expires_at
+        if expires_at > now:
+            target.status = "active" if starts_at <= now else "pending"
         target.priority = plan.priority
+        target.plan = plan
         return target
 
     def _schedule_new_subscription(
         self,
         new_sub: UserSubscription,
         plan: SubscriptionPlan,
-        existing: Sequence[UserSubscription],
+        blockers: Sequence[UserSubscription],
+        lower: Sequence[UserSubscription],
         duration: timedelta,
         now: datetime,
-    ) -> None:
-        blockers = [
-            sub
-            for sub in existing
-            if sub.priority >= plan.priority and sub.status in ACTIVE_STATUSES
-        ]
+    ) -> list[dict[str, Any]]:
         start_at = now
-        if blockers:
-            start_at = max(start_at, max(self._subscription_end(sub, now) for sub in blockers))
+        for sub in blockers:
+            end = self._subscription_end(sub, now)
+            if end > start_at:
+                start_at = end
 
         new_sub.priority = plan.priority
         if start_at <= now:
@@ -262,36 +356,49 @@ class SubscriptionService:
             new_sub.activated_at = now
             new_sub.starts_at = now
             new_sub.expires_at = now + duration
-            self._delay_lower_priority(existing, plan.priority, new_sub.expires_at, now)
-        else:
-            new_sub.status = "pending"
-            new_sub.starts_at = start_at
-            new_sub.expires_at = start_at + duration
+            return self._delay_lower_priority(lower, new_sub.expires_at, now)
+        new_sub.status = "pending"
+        new_sub.starts_at = start_at
+        new_sub.expires_at = start_at + duration
+        return []
 
     def _delay_lower_priority(
         self,
-        subscriptions: Sequence[UserSubscription],
-        new_priority: int,
+        lower: Sequence[UserSubscription],
         tail_start: datetime,
         now: datetime,
-    ) -> None:
-        lower = [
-            sub
-            for sub in subscriptions
-            if sub.priority < new_priority and sub.status in ACTIVE_STATUSES
+    ) -> list[dict[str, Any]]:
+        """Queue lower-priority subscriptions after ``tail_start``.
+
+        Returns bulk UPDATE parameters for the caller to execute; the loaded
+        objects are updated as already-persisted so the flush skips them.
+        """
+
+        # Snapshot sort keys and remaining time once, before any row is mutated.
+        queue = [
+            (
+                -sub.priority,
+                self._effective_start(sub, now),
+                self._remaining_duration(sub, now),
+                sub,
+            )
+            for sub in lower
         ]
-        if not lower:
-            return
+        if not queue:
+            return []
 
+        queue.sort(key=itemgetter(0, 1))
         tail = tail_start
-        for sub in sorted(lower, key=lambda s: (-s.priority, self._effective_start(s, now))):
-            remaining = self._remaining_duration(sub, now)
-            if remaining <= timedelta(0):
+        payloads: list[dict[str, Any]] = []
+        for _, _, remaining, sub in queue:
+            if remaining <= _NO_TIME:
                 continue
-            sub.status = "pending"
-            sub.starts_at = tail
-            sub.expires_at = tail + remaining
-            tail = sub.expires_at
+            values = {"status": "pending", "starts_at": tail, "expires_at": tail + remaining}
+            for key, value in values.items():
+                set_committed_value(sub, key, value)
+            payloads.append({"id": sub.id, **values})
+            tail = values["expires_at"]
+        return payloads
 
     def _subscription_end(self, sub: UserSubscription, now: datetime) -> datetime:
         if sub.expires_at and sub.expires_at > now:
@@ -310,8 +417,8 @@ class SubscriptionService:
 
     def _remaining_duration(self, sub: UserSubscription, now: datetime) -> timedelta:
         if not sub.expires_at:
-            return timedelta(0)
+            return _NO_TIME
         if sub.status == "active":
-            return max(timedelta(0), sub.expires_at - now)
+            return max(_NO_TIME, sub.expires_at - now)
         start = sub.starts_at or now
-        return max(timedelta(0), sub.expires_at - start)
+        return max(_NO_TIME, sub.expires_at - start)
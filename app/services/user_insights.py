@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models.core import ConversationArchive, UserImpression
@@ -12,6 +12,32 @@ from app.utils.datetime import utc_now
 
 MAX_IMPRESSION_LENGTH = 500
 
+_IMPRESSION_STMT = select(UserImpression).where(UserImpression.user_id == bindparam("user_id"))
+_IMPRESSION_TEXT_STMT = select(UserImpression.impression).where(
+    UserImpression.user_id == bindparam("user_id")
+)
+_SUMMARY_FILTERS = (
+    ConversationArchive.user_id == bindparam("user_id"),
+    ConversationArchive.summary_text.is_not(None),
+    ConversationArchive.summary_text != "",
+)
+_SUMMARY_COUNT_STMT = (
+    select(func.count()).select_from(ConversationArchive).where(*_SUMMARY_FILTERS)
+)
+# ``count(*) OVER ()`` returns the unpaged total alongside each row of the page.
+_SUMMARY_WINDOW_STMT = (
+    select(
+        ConversationArchive.id,
+        ConversationArchive.created_at,
+        ConversationArchive.summary_text,
+        func.count().over().label("total"),
+    )
+    .where(*_SUMMARY_FILTERS)
+    .order_by(ConversationArchive.created_at.desc(), ConversationArchive.id.desc())
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+
 
 class UserInsightService:
     """Manage long-lived user insights consumed by agent tools."""
@@ -26,8 +52,7 @@ class UserInsightService:
         if len(text) > MAX_IMPRESSION_LENGTH:
             text = text[:MAX_IMPRESSION_LENGTH]
 
-        stmt = select(UserImpression).where(UserImpression.user_id == user_id)
-        result = await self.session.execute(stmt)
+        result = await self.session.execute(_IMPRESSION_STMT, {"user_id": user_id})
         record = result.scalar_one_or_none()
         if record:
             record.impression = text
@@ -53,33 +78,26 @@ class UserInsightService:
         window_size = min(end_idx - start_idx + 1, 10)
         offset = start_idx - 1
 
-        filters = (
-            ConversationArchive.user_id == user_id,
-            ConversationArchive.summary_text.is_not(None),
-            ConversationArchive.summary_text != "",
+        result = await self.session.execute(
+            _SUMMARY_WINDOW_STMT,
+            {"user_id": user_id, "offset": offset, "limit": window_size},
         )
-
-        count_stmt = select(func.count()).select_from(ConversationArchive).where(*filters)
-        total = int((await self.session.execute(count_stmt)).scalar_one() or 0)
-
-        stmt = (
-            select(ConversationArchive)
-            .where(*filters)
-            .order_by(ConversationArchive.created_at.desc(), ConversationArchive.id.desc())
-            .offset(offset)
-            .limit(window_size)
-        )
-        rows = (await self.session.execute(stmt)).scalars().all()
-
-        records: list[dict[str, Any]] = []
-        for row in rows:
-            records.append(
-                {
-                    "record_id": row.id,
-                    "created_at": row.created_at.isoformat(sep=" ") if row.created_at else None,
-                    "summary": row.summary_text or "",
-                }
-            )
+        rows = result.all()
+        records = [
+            {
+                "record_id": row.id,
+                "created_at": row.created_at.isoformat(sep=" ") if row.created_at else None,
+                "summary": row.summary_text or "",
+            }
+            for row in rows
+        ]
+        if rows:
+            total = rows[0].total
+        else:
+            # An empty page (e.g. offset past the end) carries no window count.
+            count_result = await self.session.execute(_SUMMARY_COUNT_STMT, {"user_id": user_id})
+            total = count_result.scalar_one() or 0
+        total = int(total)
 
         range_end = start_idx + len(records) - 1 if records else start_idx - 1
         return {
@@ -91,8 +109,7 @@ class UserInsightService:
         }
 
     async def get_impression(self, user_id: int) -> str | None:
-        stmt = select(UserImpression.impression).where(UserImpression.user_id == user_id)
-        result = await self.session.execute(stmt)
+        result = await self.session.execute(_IMPRESSION_TEXT_STMT, {"user_id": user_id})
         impression = result.scalar_one_or_none()
         if impression:
             return impression
@@ -3,10 +3,17 @@
 from __future__ import annotations
 
 import asyncio
+import random
 from typing import Awaitable, Callable, TypeVar
 
 T = TypeVar("T")
 AsyncFactory = Callable[[], Awaitable[T]]
+RetryPredicate = Callable[[BaseException], bool]
+Sleeper = Callable[[float], Awaitable[object]]
+
+
+def _always_retry(exc: BaseException) -> bool:
+    return True
 
 
 async def retry_async(
@@ -14,19 +21,29 @@ async def retry_async(
     *,
     max_attempts: int = 3,
     base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    retryable: RetryPredicate = _always_retry,
     logger=None,
     operation_name: str = "operation",
+    sleep: Sleeper = asyncio.sleep,
 ) -> T:
-    """Retry an async operation with linear backoff."""
+    """Retry an async operation with jittered exponential backoff.
+
+    ``retryable`` decides whether a failure is worth another attempt; errors it
+    rejects (validation, auth, other permanent failures) are re-raised at once.
+    Timeouts, rate limits and 5xx responses are the typical retryable cases.
+    ``sleep`` waits out each backoff delay and defaults to ``asyncio.sleep``.
+    """
 
     attempt = 1
     while attempt <= max_attempts:
         try:
             return await operation()
         except Exception as exc:
-            if attempt >= max_attempts:
+            if attempt >= max_attempts or not retryable(exc):
                 raise
-            delay = base_delay * attempt
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            delay *= random.uniform(0.8, 1.2)
             if logger is not None:
                 logger.warning(
                     "retrying_operation",
@@ -36,11 +53,11 @@ async def retry_async(
                     delay=delay,
                     error=str(exc),
                 )
-            await asyncio.sleep(delay)
+            await sleep(delay)
             attempt += 1
 
     # This point is never reached but keeps type-checkers happy.
     raise RuntimeError(f"{operation_name} failed after {max_attempts} attempts")
 
 
-__all__ = ["retry_async"]
+__all__ = ["RetryPredicate", "Sleeper", "retry_async"]
@@ -2,24 +2,35 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
+
+# Longer strings are estimated directly so the cache stays small.
+_CACHEABLE_LENGTH = 2048
+
 
 def estimate_tokens(text: str) -> int:
     """Approximate tokens using 1 non-ASCII == 1 token, 2 ASCII == 1 token."""
 
     if not text:
         return 0
+    if len(text) > _CACHEABLE_LENGTH:
+        return _estimate(text)
+    return _estimate_cached(text)
+
+
+def _estimate(text: str) -> int:
+    length = len(text)
+    if text.isascii():
+        return (length + 1) // 2
+
+    # Encoding with errors="ignore" drops exactly the non-ASCII characters,
+    # which keeps the counting loop in C.
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    non_ascii_chars = length - ascii_chars
+    return (ascii_chars + 1) // 2 + non_ascii_chars
+
 
-    ascii_chars = 0
-    non_ascii_chars = 0
-    for char in text:
-        if char.isascii():
-            ascii_chars += 1
-        else:
-            non_ascii_chars += 1
-
-    tokens_from_ascii = (ascii_chars + 1) // 2
-    total = tokens_from_ascii + non_ascii_chars
-    return total if total > 0 else 1
+_estimate_cached = lru_cache(maxsize=4096)(_estimate)
 
 
 __all__ = ["estimate_tokens"]
@@ -16,9 +16,12 @@ CREATE TABLE IF NOT EXISTS subscription_plans (
     priority SMALLINT UNSIGNED NOT NULL DEFAULT 0,
     features JSON NULL,
     is_active TINYINT(1) NOT NULL DEFAULT 1,
+    -- 1 for the active default plan, NULL otherwise; the unique key allows one such row.
+    default_slot TINYINT(1) AS (IF(is_default = 1 AND is_active = 1, 1, NULL)) STORED,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    UNIQUE KEY uq_subscription_plans_code (code)
+    UNIQUE KEY uq_subscription_plans_code (code),
+    UNIQUE KEY uq_subscription_plans_default (default_slot)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 CREATE TABLE IF NOT EXISTS users (
@@ -98,7 +101,7 @@ CREATE TABLE IF NOT EXISTS user_subscriptions (
     KEY idx_user_subscriptions_user (user_id),
     KEY idx_user_subscriptions_plan (plan_id),
     KEY idx_user_subscriptions_status (status),
-    KEY idx_user_subscriptions_priority (user_id, priority),
+    KEY idx_user_subscriptions_active (user_id, status, priority DESC, expires_at DESC),
     CONSTRAINT fk_user_subscriptions_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     CONSTRAINT fk_user_subscriptions_plan FOREIGN KEY (plan_id) REFERENCES subscription_plans(id) ON DELETE RESTRICT,
     CONSTRAINT fk_user_subscriptions_card FOREIGN KEY (source_card_id) REFERENCES subscription_cards(id) ON DELETE SET NULL
@@ -175,6 +178,7 @@ CREATE TABLE IF NOT EXISTS conversation_archives (
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     UNIQUE KEY uq_conversation_archives_conversation (conversation_id),
     KEY idx_conversation_archives_user (user_id),
+    KEY idx_conversation_archives_user_created (user_id, created_at DESC, id DESC),
     CONSTRAINT fk_conversation_archives_conversation FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
     CONSTRAINT fk_conversation_archives_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
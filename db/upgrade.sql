@@ -0,0 +1,18 @@
+-- Upgrade statements for databases created from an older db/schema.sql
+-- Target database: MySQL 8.0+
+-- Fresh installs already get these changes from schema.sql; apply only the
+-- sections that are missing on an existing database.
+
+-- subscription_plans: at most one active default plan
+ALTER TABLE subscription_plans
+  ADD COLUMN default_slot TINYINT(1) AS (IF(is_default = 1 AND is_active = 1, 1, NULL)) STORED AFTER is_active,
+  ADD UNIQUE KEY uq_subscription_plans_default (default_slot);
+
+-- user_subscriptions: active-subscription lookup index
+ALTER TABLE user_subscriptions
+  DROP INDEX idx_user_subscriptions_priority,
+  ADD INDEX idx_user_subscriptions_active (user_id, status, priority DESC, expires_at DESC);
+
+-- conversation_archives: per-user newest-first paging index
+ALTER TABLE conversation_archives
+  ADD INDEX idx_conversation_archives_user_created (user_id, created_at DESC, id DESC);
@@ -0,0 +1,170 @@
+"""Prototype rows, Telegram stand-ins and HTTP doubles shared across the tests."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from app.db.models.core import SubscriptionPlan, User
+
+FREE_PLAN_KW: dict[str, Any] = {
+    "code": "FREE",
+    "name": "Free",
+    "description": "",
+    "hourly_message_limit": 10,
+    "monthly_price": 0.0,
+    "priority": 0,
+    "is_default": True,
+}
+PLUS_PLAN_KW: dict[str, Any] = {
+    "code": "PLUS",
+    "name": "Plus",
+    "description": "",
+    "hourly_message_limit": 100,
+    "monthly_price": 10.0,
+    "priority": 10,
+    "is_default": False,
+}
+PRO_PLAN_KW: dict[str, Any] = {
+    "code": "PRO",
+    "name": "Pro",
+    "description": "",
+    "hourly_message_limit": 50,
+    "monthly_price": 10.0,
+    "priority": 20,
+    "is_default": False,
+}
+
+
+def free_plan(**overrides: Any) -> SubscriptionPlan:
+    return SubscriptionPlan(**{**FREE_PLAN_KW, **overrides})
+
+
+def plus_plan(**overrides: Any) -> SubscriptionPlan:
+    return SubscriptionPlan(**{**PLUS_PLAN_KW, **overrides})
+
+
+def pro_plan(**overrides: Any) -> SubscriptionPlan:
+    return SubscriptionPlan(**{**PRO_PLAN_KW, **overrides})
+
+
+def make_user(telegram_id: int, **overrides: Any) -> User:
+    return User(telegram_id=telegram_id, **{"username": "tester", **overrides})
+
+
+@dataclass(frozen=True, slots=True)
+class FakeSubscriptionSettings:
+    subscription_duration_days: int = 30
+
+
+@dataclass(frozen=True, slots=True)
+class FakeSettings:
+    """The slice of ``BotSettings`` that ``SubscriptionService`` and the chat handlers read."""
+
+    subscriptions: FakeSubscriptionSettings = FakeSubscriptionSettings()
+    default_language: str = "en"
+    admin_telegram_id: int | None = None
+
+
+def subscription_settings(duration_days: int = 30) -> FakeSettings:
+    return FakeSettings(FakeSubscriptionSettings(duration_days))
+
+
+class DummyFromUser:
+    __slots__ = ("id", "username", "first_name", "last_name", "language_code", "full_name")
+
+    def __init__(
+        self, user_id: int = 1, full_name: str = "Test User", language_code: str = "en"
+    ) -> None:
+        self.id = user_id
+        self.username = f"user{user_id}"
+        self.first_name = full_name.split()[0]
+        self.last_name = "".join(full_name.split()[1:]) or "User"
+        self.language_code = language_code
+        self.full_name = full_name
+
+
+class DummyMessage:
+    """Minimal ``aiogram`` message that records what handlers answer."""
+
+    __slots__ = (
+        "text",
+        "caption",
+        "from_user",
+        "reply_to_message",
+        "entities",
+        "caption_entities",
+        "chat",
+        "bot",
+        "answers",
+        "parse_modes",
+        "_record_answer",
+        "_record_parse_mode",
+    )
+
+    def __init__(
+        self,
+        text: str = "hi",
+        from_user: DummyFromUser | None = None,
+        *,
+        caption: str | None = None,
+        reply_to_message=None,
+    ) -> None:
+        self.text = text
+        self.caption = caption
+        self.from_user = from_user or DummyFromUser()
+        self.reply_to_message = reply_to_message
+        self.entities = []
+        self.caption_entities = []
+        self.chat = SimpleNamespace(type="private")
+        self.bot = None
+        self.answers: deque[str] = deque()
+        self.parse_modes: deque[str | None] = deque()
+        self._record_answer = self.answers.append
+        self._record_parse_mode = self.parse_modes.append
+
+    async def answer(self, text: str, parse_mode: str | None = None):
+        self._record_answer(text)
+        self._record_parse_mode(parse_mode)
+        return text
+
+
+class DummyBot:
+    """Bot that records ``send_message`` calls instead of sending them."""
+
+    def __init__(self) -> None:
+        self.sent_messages: list[dict[str, Any]] = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent_messages.append({"chat_id": chat_id, "text": text, "parse_mode": parse_mode})
+
+
+class DummyResponse:
+    """Successful ``httpx.Response`` stand-in whose ``json()`` returns ``payload``."""
+
+    status_code = 200
+    text = "{}"
+
+    def __init__(self, payload: Any) -> None:
+        self.headers: dict[str, str] = {}
+        self._payload = payload
+
+    def raise_for_status(self) -> None:
+        return None
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class SnapshotClient:
+    """HTTP client whose ``get`` always answers ``payload`` and records each call."""
+
+    def __init__(self, payload: Any) -> None:
+        self.payload = payload
+        self.calls: list[dict[str, Any]] = []
+
+    async def get(self, url, params=None, timeout=None):
+        self.calls.append({"url": url, "params": params, "timeout": timeout})
+        return DummyResponse(self.payload)
@@ -2,67 +2,187 @@
 
 from __future__ import annotations
 
+from functools import partial
+from typing import Any
+
+import httpx
+import pytest
 import pytest_asyncio
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.pool import StaticPool
 
+from _factories import DummyBot, DummyFromUser, DummyMessage, free_plan, plus_plan, pro_plan
 from app.db.base import Base
+from app.db.models.core import SubscriptionPlan
+from app.services import rate_limit as rate_limit_module
+from app.services import subscriptions as subscriptions_module
+from app.utils.retry import retry_async
+
+# Modules that call retry_async; no_retry_backoff rebinds the name in each of them.
+_RETRY_CALLERS = (
+    "app.agents.runner",
+    "app.agents.summary",
+    "app.bot.utils.telegram",
+    "app.services.external_tools",
+)
+
+
+def pytest_collection_modifyitems(config, items):
+    # Under ``--dist=loadgroup`` keep every database test on one xdist worker so the
+    # module-scoped plans and the shared in-memory engine are set up once; pure unit
+    # tests spread across the remaining workers.
+    if not config.pluginmanager.hasplugin("xdist"):
+        return
+    for item in items:
+        if "session" in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.xdist_group("db"))
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_caches(monkeypatch):
+    # Each test's rows are rolled back, so ids must not match the previous test's caches.
+    monkeypatch.setattr(rate_limit_module, "_exhausted", (None, {}))
+    monkeypatch.setattr(subscriptions_module, "_default_plan_cache", (0.0, None))
+
+
+@pytest.fixture
+def no_retry_backoff(monkeypatch):
+    """Run retry_async without waiting between attempts, for retry-count tests."""
+
+    async def _noop_sleep(delay: float) -> None:
+        return None
+
+    fast_retry = partial(retry_async, sleep=_noop_sleep)
+    for module in _RETRY_CALLERS:
+        monkeypatch.setattr(f"{module}.retry_async", fast_retry)
+
+
+@pytest.fixture
+def dummy_bot() -> DummyBot:
+    return DummyBot()
+
 
+@pytest.fixture
+def make_message():
+    """Build a ``DummyMessage`` sent by the Telegram user ``user_id``."""
 
-class _AsyncSessionWrapper:
-    def __init__(self, sync_session) -> None:
-        self._sync = sync_session
+    def _make(
+        text: str = "hi", user_id: int = 1, *, full_name: str = "Test User", **kwargs
+    ) -> DummyMessage:
+        return DummyMessage(text, DummyFromUser(user_id, full_name), **kwargs)
 
-    async def execute(self, *args, **kwargs):
-        return self._sync.execute(*args, **kwargs)
+    return _make
 
-    async def get(self, *args, **kwargs):
-        return self._sync.get(*args, **kwargs)
 
-    def add(self, obj) -> None:
-        self._sync.add(obj)
+@pytest_asyncio.fixture(scope="session")
+async def _http_routes():
+    """One mocked ``AsyncClient`` for the run plus the slot holding its current handler."""
 
-    def add_all(self, objs) -> None:
-        self._sync.add_all(objs)
+    routes: dict[str, Any] = {"handler": None}
 
-    async def flush(self) -> None:
-        self._sync.flush()
+    async def _dispatch(request: httpx.Request) -> httpx.Response:
+        handler = routes["handler"]
+        if handler is None:
+            raise AssertionError(f"Unexpected HTTP request: {request.method} {request.url}")
+        return await handler(request)
 
-    async def commit(self) -> None:
-        self._sync.commit()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(_dispatch)) as client:
+        routes["client"] = client
+        yield routes
 
-    async def close(self) -> None:
-        self._sync.close()
 
-    async def rollback(self) -> None:
-        self._sync.rollback()
+@pytest.fixture
+def http_client(_http_routes) -> httpx.AsyncClient:
+    """Shared client; requests fail unless the test installs a handler via ``route_http``."""
 
+    return _http_routes["client"]
 
-class _AsyncContextManagerWrapper:
-    def __init__(self, cm):
-        self._cm = cm
 
-    async def __aenter__(self):
-        return self._cm.__enter__()
+@pytest.fixture
+def route_http(_http_routes):
+    """Answer ``http_client`` requests with ``handler`` for the rest of the test."""
 
-    async def __aexit__(self, exc_type, exc, tb):
-        return self._cm.__exit__(exc_type, exc, tb)
+    def _route(handler) -> None:
+        _http_routes["handler"] = handler
+
+    try:
+        yield _route
+    finally:
+        _http_routes["handler"] = None
+
+
+@pytest_asyncio.fixture(scope="session")
+async def engine():
+    # One in-memory database per process (so one per xdist worker); StaticPool keeps every checkout
+    # on the same connection so the schema is only created once.
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+
+    # pysqlite issues BEGIN lazily and breaks SAVEPOINT semantics; let SQLAlchemy
+    # emit BEGIN itself so each test can run inside a rolled-back transaction.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_connection(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+        # Enforce foreign keys like InnoDB does in production.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def connection(engine):
+    # One connection for the whole run; each test begins and rolls back its own
+    # outer transaction on it.
+    async with engine.connect() as connection:
+        yield connection
+
+
+@pytest_asyncio.fixture(scope="module")
+async def plans(connection):
+    """FREE/PLUS/PRO plans committed once per test module, keyed by code.
+
+    The rows live outside the per-test transaction, so tests should refer to
+    them by ``id`` rather than attaching the (detached) objects to their session.
+    """
+
+    records = {"FREE": free_plan(), "PLUS": plus_plan(), "PRO": pro_plan()}
+    async with AsyncSession(bind=connection, expire_on_commit=False) as setup:
+        setup.add_all(records.values())
+        await setup.commit()
+    try:
+        yield records
+    finally:
+        plan_ids = [plan.id for plan in records.values()]
+        async with AsyncSession(bind=connection) as teardown:
+            await teardown.execute(
+                delete(SubscriptionPlan).where(SubscriptionPlan.id.in_(plan_ids))
+            )
+            await teardown.commit()
 
 
 @pytest_asyncio.fixture
-async def session():
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        future=True,
+async def session(connection):
+    # Every test works inside an outer transaction that is rolled back;
+    # session commits only release savepoints.
+    transaction = await connection.begin()
+    async_session = AsyncSession(
+        bind=connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
-    Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
-    sync_session = SessionLocal()
     try:
-        yield _AsyncSessionWrapper(sync_session)
+        yield async_session
     finally:
-        sync_session.close()
-        engine.dispose()
+        await async_session.close()
+        await transaction.rollback()
@@ -14,7 +14,7 @@ class DummySummary:
 
 
 @pytest.mark.asyncio
-async def test_agent_orchestrator_retries_on_failure(monkeypatch, session):
+async def test_agent_orchestrator_retries_on_failure(monkeypatch, session, no_retry_backoff):
     attempts = {"count": 0}
 
     class DummyAgent:
@@ -41,11 +41,6 @@ async def test_agent_orchestrator_retries_on_failure(monkeypatch, session):
         staticmethod(lambda settings: None),
     )
 
-    async def _noop(delay):
-        return None
-
-    monkeypatch.setattr("app.utils.retry.asyncio.sleep", _noop)
-
     settings = SimpleNamespace(
         llm=LLMSettings(provider="openai", model="gpt", request_timeout_seconds=5),
         agent_timeout_seconds=10,
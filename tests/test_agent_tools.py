@@ -5,6 +5,7 @@ from types import SimpleNamespace
 
 from pydantic import SecretStr
 
+from _factories import SnapshotClient
 from app.agents.toolkit import (
     FetchMarketSnapshotInput,
     FetchPermanentSummariesInput,
@@ -27,29 +28,6 @@ def _tool_ctx(http_client, tool_settings):
     )
 
 
-class _SnapshotClient:
-    def __init__(self, payload):
-        self.payload = payload
-
-    async def get(self, url, params=None, timeout=None):
-
-        class _Response:
-            status_code = 200
-            text = "{}"
-            headers = {}
-
-            def __init__(self, payload):
-                self._payload = payload
-
-            def raise_for_status(self):
-                return None
-
-            def json(self):
-                return self._payload
-
-        return _Response(self.payload)
-
-
 @pytest.mark.asyncio
 async def test_update_impression_tool(session):
     user = User(telegram_id=1, username="ctx", language_code="en")
@@ -68,25 +46,20 @@ async def test_update_impression_tool(session):
 @pytest.mark.asyncio
 async def test_fetch_permanent_summaries_tool(session):
     user = User(telegram_id=2, username="ctx2", language_code="en")
-    session.add(user)
-    await session.flush()
     convo = Conversation(
-        user_id=user.id,
+        user=user,
         title="Chat",
         context_tokens=0,
         status="active",
     )
-    session.add(convo)
-    await session.flush()
-
     archive = ConversationArchive(
-        conversation_id=convo.id,
-        user_id=user.id,
+        conversation=convo,
+        user=user,
         summary_text="Stored summary",
         history=[],
         token_count=10,
     )
-    session.add(archive)
+    session.add_all([user, convo, archive])
     await session.flush()
 
     ctx = _ctx(session, user.id)
@@ -117,7 +90,7 @@ async def test_fetch_market_snapshot_tool():
     }
 
     ctx = _tool_ctx(
-        _SnapshotClient(payload),
+        SnapshotClient(payload),
         ExternalToolSettings(),
     )
 
@@ -135,7 +108,7 @@ async def test_fetch_market_snapshot_tool():
 @pytest.mark.asyncio
 async def test_fetch_market_snapshot_tool_handles_error():
     ctx = _tool_ctx(
-        _SnapshotClient({}),
+        SnapshotClient({}),
         ExternalToolSettings(),
     )
 
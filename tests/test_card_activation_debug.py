@@ -5,27 +5,15 @@ from __future__ import annotations
 from datetime import datetime, timezone, timedelta
 
 import pytest
-from app.db.models.core import SubscriptionCard, SubscriptionPlan, User
+from app.db.models.core import SubscriptionCard, User
 from app.services.subscriptions import SubscriptionService
 from app.utils.datetime import utc_now
 
 
 @pytest.mark.asyncio
-async def test_real_card_activation_flow(session):
+async def test_real_card_activation_flow(session, plans):
     """Test the full card activation flow with real service."""
-    # Create a plan
-    plan = SubscriptionPlan(
-        code="PLUS",
-        name="Plus",
-        description="Plus plan",
-        hourly_message_limit=100,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-        is_active=True,
-    )
-    session.add(plan)
-    await session.flush()
+    plan = plans["PLUS"]
 
     # Create a user
     user = User(
@@ -33,8 +21,6 @@ async def test_real_card_activation_flow(session):
         username="testuser",
         language_code="en",
     )
-    session.add(user)
-    await session.flush()
 
     # Create a real card
     card = SubscriptionCard(
@@ -44,7 +30,7 @@ async def test_real_card_activation_flow(session):
         valid_days=30,
         expires_at=None,  # Card doesn't expire
     )
-    session.add(card)
+    session.add_all([user, card])
     await session.flush()
 
     # Now try to redeem the card
@@ -57,10 +43,7 @@ async def test_real_card_activation_flow(session):
     assert subscription.plan_id == plan.id
     assert subscription.expires_at is not None, "expires_at should be set!"
     assert subscription.status in ["active", "pending"]
-    
-    # Flush to ensure ID is assigned
-    await session.flush()
-    
+    # redeem_card flushes before returning, so the ID is already assigned.
     assert subscription.id is not None
     print(f"Subscription created: {subscription.id}")
     print(f"Status: {subscription.status}")
@@ -75,31 +58,10 @@ async def test_real_card_activation_flow(session):
 
 
 @pytest.mark.asyncio
-async def test_card_with_existing_subscription(session):
+async def test_card_with_existing_subscription(session, plans):
     """Test card activation when user already has a subscription."""
-    # Create plans
-    free_plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="Free plan",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-        is_active=True,
-    )
-    plus_plan = SubscriptionPlan(
-        code="PLUS",
-        name="Plus",
-        description="Plus plan",
-        hourly_message_limit=100,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-        is_active=True,
-    )
-    session.add_all([free_plan, plus_plan])
-    await session.flush()
+    free_plan = plans["FREE"]
+    plus_plan = plans["PLUS"]
 
     # Create a user with default subscription
     user = User(
@@ -107,16 +69,6 @@ async def test_card_with_existing_subscription(session):
         username="testuser2",
         language_code="en",
     )
-    session.add(user)
-    await session.flush()
-
-    # Create default subscription for user
-    service = SubscriptionService(session)
-    default_sub = await service.ensure_default_subscription(user)
-    await session.flush()
-    
-    assert default_sub.plan_id == free_plan.id
-    assert default_sub.expires_at is None  # Free plan doesn't expire
 
     # Create a plus card
     card = SubscriptionCard(
@@ -125,9 +77,16 @@ async def test_card_with_existing_subscription(session):
         status="new",
         valid_days=30,
     )
-    session.add(card)
+    session.add_all([user, card])
     await session.flush()
 
+    # Create default subscription for user
+    service = SubscriptionService(session)
+    default_sub = await service.ensure_default_subscription(user)
+    
+    assert default_sub.plan_id == free_plan.id
+    assert default_sub.expires_at is None  # Free plan doesn't expire
+
     # Redeem the plus card
     plus_sub = await service.redeem_card(user, "PLUS-UPGRADE-CARD-001")
     
@@ -136,9 +95,7 @@ async def test_card_with_existing_subscription(session):
     assert plus_sub.user_id == user.id
     assert plus_sub.plan_id == plus_plan.id
     assert plus_sub.expires_at is not None, "Plus subscription should have expires_at!"
-    
-    await session.flush()
-    
+
     print(f"\nPlus Subscription created: {plus_sub.id}")
     print(f"Status: {plus_sub.status}")
     print(f"Priority: {plus_sub.priority}")
@@ -2,35 +2,28 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
-from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
 
 import pytest
+from sqlalchemy import select
 
-from app.db.models.core import SubscriptionCard, SubscriptionPlan, User, UserSubscription
+from _factories import subscription_settings
+from app.db.models.core import SubscriptionCard, User, UserSubscription
+from app.services import subscriptions as subscriptions_module
 from app.services.subscriptions import SubscriptionService
 from app.services.exceptions import CardNotFound
-from app.utils.datetime import utc_now
 
+FROZEN_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
 
-def _settings(duration_days: int = 30) -> SimpleNamespace:
-    return SimpleNamespace(subscriptions=SimpleNamespace(subscription_duration_days=duration_days))
 
+@pytest.fixture(autouse=True)
+def frozen_now(monkeypatch) -> datetime:
+    monkeypatch.setattr(subscriptions_module, "utc_now", lambda: FROZEN_NOW)
+    return FROZEN_NOW
 
-async def _bootstrap_user_and_plan(session, *, priority: int = 0) -> tuple[User, SubscriptionPlan]:
-    plan = SubscriptionPlan(
-        code="PRO" if priority else "FREE",
-        name="Plan",
-        description="Test plan",
-        hourly_message_limit=50,
-        monthly_price=0.0,
-        priority=priority,
-        is_default=(priority == 0),
-    )
-    user = User(telegram_id=5555 + priority, username=f"user-{priority}")
-    session.add_all([plan, user])
-    await session.flush()
-    return user, plan
+
+def _user() -> User:
+    return User(telegram_id=5555, username="user-0")
 
 
 def _card(plan_id: int, code: str, days: int = 10) -> SubscriptionCard:
@@ -39,17 +32,18 @@ def _card(plan_id: int, code: str, days: int = 10) -> SubscriptionCard:
         plan_id=plan_id,
         status="new",
         valid_days=days,
-        expires_at=utc_now() + timedelta(days=30),
+        expires_at=FROZEN_NOW + timedelta(days=30),
     )
 
 
 @pytest.mark.asyncio
-async def test_redeem_card_creates_new_subscription(session):
-    user, plan = await _bootstrap_user_and_plan(session)
-    service = SubscriptionService(session, settings=_settings())
+async def test_redeem_card_creates_new_subscription(session, plans):
+    plan = plans["FREE"]
+    user = _user()
     card = _card(plan.id, "CARD-NEW")
-    session.add(card)
+    session.add_all([user, card])
     await session.flush()
+    service = SubscriptionService(session, settings=subscription_settings())
 
     subscription = await service.redeem_card(user, card.code)
 
@@ -60,30 +54,70 @@ async def test_redeem_card_creates_new_subscription(session):
 
 
 @pytest.mark.asyncio
-async def test_redeem_card_stacks_same_plan_duration(session):
-    user, plan = await _bootstrap_user_and_plan(session)
-    service = SubscriptionService(session, settings=_settings())
-
+async def test_redeem_card_stacks_same_plan_duration(session, plans, monkeypatch):
+    plan = plans["FREE"]
+    user = _user()
     first_card = _card(plan.id, "CARD-1", days=5)
-    session.add(first_card)
+    second_card = _card(plan.id, "CARD-2", days=3)
+    session.add_all([user, first_card, second_card])
     await session.flush()
+    service = SubscriptionService(session, settings=subscription_settings())
+
     subscription = await service.redeem_card(user, first_card.code)
 
-    assert subscription.expires_at is not None
-    first_expiry = subscription.expires_at
+    assert subscription.expires_at == FROZEN_NOW + timedelta(days=5)
 
-    second_card = _card(plan.id, "CARD-2", days=3)
-    session.add(second_card)
-    await session.flush()
+    # A day later the second card extends the still-running subscription.
+    later = FROZEN_NOW + timedelta(days=1)
+    monkeypatch.setattr(subscriptions_module, "utc_now", lambda: later)
     stacked = await service.redeem_card(user, second_card.code)
 
     assert stacked.id == subscription.id
-    assert stacked.expires_at > first_expiry
+    assert stacked.expires_at == FROZEN_NOW + timedelta(days=8)
 
 
 @pytest.mark.asyncio
 async def test_redeem_card_rejects_invalid_code(session):
-    user, plan = await _bootstrap_user_and_plan(session)
-    service = SubscriptionService(session, settings=_settings())
+    user = _user()
+    session.add(user)
+    await session.flush()
+    service = SubscriptionService(session, settings=subscription_settings())
     with pytest.raises(CardNotFound):
         await service.redeem_card(user, "UNKNOWN")
+
+
+@pytest.mark.asyncio
+async def test_redeem_higher_priority_card_delays_lower_subscription(session, plans):
+    user = _user()
+    lower = UserSubscription(
+        user=user,
+        plan_id=plans["PLUS"].id,
+        priority=plans["PLUS"].priority,
+        status="active",
+        activated_at=FROZEN_NOW - timedelta(days=2),
+        starts_at=FROZEN_NOW - timedelta(days=2),
+        expires_at=FROZEN_NOW + timedelta(days=8),
+    )
+    card = _card(plans["PRO"].id, "CARD-PRO", days=5)
+    session.add_all([user, lower, card])
+    await session.flush()
+    service = SubscriptionService(session, settings=subscription_settings())
+
+    upgraded = await service.redeem_card(user, card.code)
+
+    assert upgraded.status == "active"
+    assert upgraded.expires_at == FROZEN_NOW + timedelta(days=5)
+    # The 8 days PLUS had left resume once PRO ends.
+    expected = ("pending", FROZEN_NOW + timedelta(days=5), FROZEN_NOW + timedelta(days=13))
+    assert (lower.status, lower.starts_at, lower.expires_at) == expected
+    stored = (
+        await session.execute(
+            select(
+                UserSubscription.status, UserSubscription.starts_at, UserSubscription.expires_at
+            ).where(UserSubscription.id == lower.id)
+        )
+    ).one()
+    # SQLite hands column values back naive; they are stored as UTC.
+    assert stored.status == "pending"
+    assert stored.starts_at.replace(tzinfo=timezone.utc) == expected[1]
+    assert stored.expires_at.replace(tzinfo=timezone.utc) == expected[2]
@@ -4,13 +4,17 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 from types import SimpleNamespace
+from unittest.mock import create_autospec
 
 import pytest
+import pytest_asyncio
 from aiogram.types import ReactionTypeEmoji, ReactionTypeCustomEmoji
 
 from sqlalchemy import select
 from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
 
+from _factories import FakeSettings
+from app.agents.runner import AgentOrchestrator
 from app.bot.routers import chat as chat_router
 from app.bot.routers.chat import (
     handle_announce,
@@ -21,266 +25,206 @@ from app.bot.routers.chat import (
     handle_new_conversation,
     handle_status,
 )
-from app.db.models.core import Conversation, ConversationArchive, Message, SubscriptionCard, SubscriptionPlan, User
+from app.db.models.core import Conversation, ConversationArchive, Message, SubscriptionCard, User
 from app.services.exceptions import CardNotFound
 
 
-class DummyMessage:
-    def __init__(self, text: str, from_user, *, caption: str | None = None, reply_to_message=None):
-        self.text = text
-        self.caption = caption
-        self.from_user = from_user
-        self.reply_to_message = reply_to_message
-        self.answers: list[tuple[str, str | None]] = []
+class FakeSubscriptionService:
+    """Stand-in for ``SubscriptionService`` in /activate tests.
 
-    async def answer(self, text: str, parse_mode: str | None = None):
-        self.answers.append((text, parse_mode))
-        return text
+    ``redeem_card`` activates ``plan``, or rejects the card when ``plan`` is ``None``.
+    """
 
+    plan = None
 
-class DummyFromUser:
-    def __init__(self, user_id: int = 1, full_name: str = "Test User"):
-        self.id = user_id
-        self.full_name = full_name
-        self.language_code = "en"
+    def __init__(self, _session, _settings=None):
+        self.session = _session
 
+    async def redeem_card(self, db_user, code):
+        plan = type(self).plan
+        if plan is None:
+            raise CardNotFound("invalid")
+        return SimpleNamespace(plan_id=plan.id, plan=plan, expires_at=datetime.now(timezone.utc))
 
-@pytest.mark.asyncio
-async def test_handle_activate_success(session, monkeypatch):
-    plan = SubscriptionPlan(
-        code="PRO",
-        name="Pro",
-        description="",
-        hourly_message_limit=50,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-    )
-    user = User(telegram_id=111, username="activate", language_code="en")
-    session.add_all([plan, user])
-    await session.flush()
 
-    class FakeSubscriptionService:
-        def __init__(self, _session):
-            self.session = _session
+@pytest.fixture(scope="module", autouse=True)
+def _deterministic_card_codes():
+    # Issued cards get predictable codes, e.g. "PRO-CARD", for the whole module.
+    with pytest.MonkeyPatch.context() as patcher:
+        patcher.setattr(chat_router, "_generate_card_code", lambda plan_code: f"{plan_code}-CARD")
+        yield
 
-        async def redeem_card(self, db_user, code):
-            subs = SimpleNamespace(plan_id=plan.id, expires_at=datetime.now(timezone.utc))
-            subs.plan_id = plan.id
-            subs.expires_at = datetime.now(timezone.utc)
-            return subs
 
+@pytest.fixture
+def fake_subscription_service(monkeypatch):
     monkeypatch.setattr(chat_router, "SubscriptionService", FakeSubscriptionService)
-    message = DummyMessage("/activate CODE123", DummyFromUser(user_id=user.telegram_id))
+    monkeypatch.setattr(FakeSubscriptionService, "plan", None)
+    return FakeSubscriptionService
+
+
+@pytest.fixture
+def agent_mock():
+    """``AgentOrchestrator`` double whose ``run`` answers "Hello there"."""
+
+    agent = create_autospec(AgentOrchestrator, instance=True)
+    agent.run.return_value = SimpleNamespace(
+        output="Hello there",
+        all_messages=lambda: [],
+        usage=lambda: SimpleNamespace(total_tokens=0),
+    )
+    agent.summarize_history.return_value = "summary"
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_handle_activate_success(session, plans, fake_subscription_service, make_message):
+    fake_subscription_service.plan = plans["PRO"]
+    user = User(telegram_id=111, username="activate", language_code="en")
+    session.add(user)
+    await session.flush()
+
+    message = make_message("/activate CODE123", user.telegram_id)
     await handle_activate(message, session, db_user=user)
 
-    assert any("Activated" in ans for ans, _ in message.answers)
+    assert "Activated" in "\n".join(message.answers)
 
 
 @pytest.mark.asyncio
-async def test_handle_activate_usage_message(session):
+async def test_handle_activate_usage_message(session, make_message):
     user = User(telegram_id=120, username="missing", language_code="en")
     session.add(user)
     await session.flush()
 
-    message = DummyMessage("/activate", DummyFromUser(user_id=user.telegram_id))
+    message = make_message("/activate", user.telegram_id)
     await handle_activate(message, session, db_user=user)
 
-    assert message.answers and "Usage" in message.answers[0][0]
+    assert message.answers and "Usage" in message.answers[0]
 
 
 @pytest.mark.asyncio
-async def test_handle_activate_invalid(session, monkeypatch):
+async def test_handle_activate_invalid(session, fake_subscription_service, make_message):
     user = User(telegram_id=112, username="activate", language_code="en")
     session.add(user)
     await session.flush()
 
-    class FakeSubscriptionService:
-        def __init__(self, _session):
-            pass
-
-        async def redeem_card(self, db_user, code):
-            raise CardNotFound("invalid")
-
-    monkeypatch.setattr(chat_router, "SubscriptionService", FakeSubscriptionService)
-    message = DummyMessage("/activate BAD", DummyFromUser(user_id=user.telegram_id))
+    message = make_message("/activate BAD", user.telegram_id)
     await handle_activate(message, session, db_user=user)
 
-    assert message.answers and "Invalid" in message.answers[0][0]
+    assert message.answers and "Invalid" in message.answers[0]
 
 
 @pytest.mark.asyncio
-async def test_handle_status_shows_subscription(session):
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
+async def test_handle_status_shows_subscription(session, plans, make_message):
     user = User(telegram_id=130, username="status", language_code="en")
-    session.add_all([plan, user])
+    session.add(user)
     await session.flush()
 
-    message = DummyMessage("/status", DummyFromUser(user_id=user.telegram_id))
+    message = make_message("/status", user.telegram_id)
     await handle_status(message, session, db_user=user)
 
     assert message.answers
-    text, _ = message.answers[0]
+    text = message.answers[0]
     assert "Plan: Free" in text
     assert "Status: Active" in text
     assert "Hourly usage: 0/10" in text
 
 
 @pytest.mark.asyncio
-async def test_handle_help_returns_placeholder(session):
+async def test_handle_help_returns_placeholder(session, make_message):
     user = User(telegram_id=140, username="helper", language_code="en")
     session.add(user)
     await session.flush()
 
-    message = DummyMessage("/help", DummyFromUser(user_id=user.telegram_id))
+    message = make_message("/help", user.telegram_id)
     await handle_help(message, session, db_user=user)
 
     assert message.answers
-    assert "/start" in message.answers[0][0]
+    assert "/start" in message.answers[0]
+
 
+_THUMBS_UP = ReactionTypeEmoji(emoji="👍")
+_CUSTOM_REACTION = ReactionTypeCustomEmoji(custom_emoji_id="abc123")
 
-def test_compose_reaction_text_handles_multiple():
-    reactions = [ReactionTypeEmoji(emoji="👍"), ReactionTypeCustomEmoji(custom_emoji_id="abc123")]
-    result = chat_router._compose_reaction_text(reactions)
-    assert result == "👍:custom:abc123:"
+
+@pytest.mark.parametrize(
+    ("reactions", "expected"),
+    [
+        ([_THUMBS_UP], "👍"),
+        ([_CUSTOM_REACTION], ":custom:abc123:"),
+        ([_THUMBS_UP, _CUSTOM_REACTION], "👍:custom:abc123:"),
+        ([], ""),
+    ],
+    ids=["emoji", "custom", "multiple", "empty"],
+)
+def test_compose_reaction_text(reactions, expected):
+    assert chat_router._compose_reaction_text(reactions) == expected
 
 
 @pytest.mark.asyncio
-async def test_handle_chat_happy_path(session, monkeypatch):
+async def test_handle_chat_happy_path(session, plans, make_message, agent_mock):
     user = User(telegram_id=113, username="chat", language_code="en")
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add_all([user, plan])
+    session.add(user)
     await session.flush()
 
-    fake_agent_result = SimpleNamespace(
-        output="Hello there",
-        all_messages=lambda: [],
-        usage=lambda: SimpleNamespace(total_tokens=0),
-    )
-
-    class FakeAgent:
-        async def run(self, **kwargs):
-            return fake_agent_result
-
-        async def summarize_history(self, history):
-            return "summary"
-
-    message = DummyMessage("hello", DummyFromUser(user_id=user.telegram_id))
-    monkeypatch.setattr(chat_router, "ConversationService", chat_router.ConversationService)
-    monkeypatch.setattr(chat_router, "MemoryService", chat_router.MemoryService)
-    agent = FakeAgent()
-
-    await handle_chat(message, session, agent, db_user=user)
+    message = make_message("hello", user.telegram_id)
+    await handle_chat(message, session, agent_mock, db_user=user)
 
+    agent_mock.run.assert_awaited_once()
     assert message.answers
-    assert any("Hello" in ans for ans, _ in message.answers)
+    assert "Hello" in "\n".join(message.answers)
 
 
 @pytest.mark.asyncio
-async def test_handle_chat_includes_reply_context(session, monkeypatch):
+async def test_handle_chat_includes_reply_context(session, plans, make_message, agent_mock):
     user = User(telegram_id=115, username="chat", language_code="en")
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add_all([user, plan])
+    session.add(user)
     await session.flush()
 
-    fake_agent_result = SimpleNamespace(
-        output="ack",
-        all_messages=lambda: [],
-        usage=lambda: SimpleNamespace(total_tokens=0),
-    )
-
-    class CapturingAgent:
-        def __init__(self):
-            self.last_user_message = None
-
-        async def run(self, **kwargs):
-            self.last_user_message = kwargs["latest_user_message"]
-            return fake_agent_result
-
-        async def summarize_history(self, history):
-            return "summary"
-
     reply_message = SimpleNamespace(
         text="previous answer",
         caption=None,
         from_user=SimpleNamespace(is_bot=True),
     )
-    message = DummyMessage(
-        "follow up question",
-        DummyFromUser(user_id=user.telegram_id),
-        reply_to_message=reply_message,
-    )
-    agent = CapturingAgent()
-    await handle_chat(message, session, agent, db_user=user)
+    message = make_message("follow up question", user.telegram_id, reply_to_message=reply_message)
+    await handle_chat(message, session, agent_mock, db_user=user)
 
-    assert agent.last_user_message is not None
-    assert agent.last_user_message.startswith('> Quote from Assistant: "previous answer"')
-    assert agent.last_user_message.splitlines()[-1] == "follow up question"
+    latest_user_message = agent_mock.run.await_args.kwargs["latest_user_message"]
+    assert latest_user_message.startswith('> Quote from Assistant: "previous answer"')
+    assert latest_user_message.splitlines()[-1] == "follow up question"
 
 
 @pytest.mark.asyncio
-async def test_handle_chat_agent_error(session, monkeypatch):
+async def test_handle_chat_agent_error(session, plans, make_message, agent_mock):
     user = User(telegram_id=114, username="chat", language_code="en")
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add_all([user, plan])
+    session.add(user)
     await session.flush()
 
-    class ExplodingAgent:
-        async def run(self, **kwargs):
-            raise RuntimeError("agent boom")
-
-    message = DummyMessage("hello", DummyFromUser(user_id=user.telegram_id))
+    agent_mock.run.side_effect = RuntimeError("agent boom")
+    message = make_message("hello", user.telegram_id)
     with pytest.raises(RuntimeError):
-        await handle_chat(message, session, ExplodingAgent(), db_user=user)
+        await handle_chat(message, session, agent_mock, db_user=user)
+
+    assert message.answers and "Agent failed" in message.answers[0]
 
-    assert message.answers and "Agent failed" in message.answers[0][0]
+
+async def _conversation_snapshot(session, user_id: int):
+    """Each conversation of ``user_id`` with its archive and history row, in one query."""
+
+    stmt = (
+        select(Conversation, ConversationArchive, Message)
+        .outerjoin(ConversationArchive, ConversationArchive.conversation_id == Conversation.id)
+        .outerjoin(Message, Message.conversation_id == Conversation.id)
+        .where(Conversation.user_id == user_id)
+    )
+    return (await session.execute(stmt)).all()
 
 
 @pytest.mark.asyncio
-async def test_handle_new_conversation_archives_and_starts_fresh(session):
+async def test_handle_new_conversation_archives_and_starts_fresh(
+    session, plans, make_message, agent_mock
+):
     user = User(telegram_id=200, username="newcmd", language_code="en")
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add_all([user, plan])
+    session.add(user)
     await session.flush()
 
     conversation_service = chat_router.ConversationService(session)
@@ -291,178 +235,117 @@ async def test_handle_new_conversation_archives_and_starts_fresh(session):
     ]
     await conversation_service.store_manual_history(conversation, user=user, messages=messages)
 
-    class FakeAgent:
-        async def summarize_history(self, history):
-            return "summary text"
+    agent_mock.summarize_history.return_value = "summary text"
 
-    message = DummyMessage("/new", DummyFromUser(user_id=user.telegram_id))
-    await handle_new_conversation(message, session, agent=FakeAgent(), db_user=user)
+    message = make_message("/new", user.telegram_id)
+    await handle_new_conversation(message, session, agent=agent_mock, db_user=user)
 
-    texts = [text for text, _ in message.answers]
-    assert any("Cleared" in text for text in texts)
+    assert "Cleared" in "\n".join(message.answers)
 
-    conversations = (await session.execute(select(Conversation))).scalars().all()
-    assert len(conversations) == 2
-    old = next(conv for conv in conversations if conv.id == conversation.id)
+    snapshot = await _conversation_snapshot(session, user.id)
+    assert len(snapshot) == 2
+    old, archive, old_history = next(row for row in snapshot if row[0].id == conversation.id)
     assert old.status == "archived"
-    active = next(conv for conv in conversations if conv.status == "active")
+    active, _, new_history = next(row for row in snapshot if row[0].status == "active")
     assert active.id != old.id
 
-    archive = (
-        await session.execute(
-            select(ConversationArchive).where(ConversationArchive.conversation_id == old.id)
-        )
-    ).scalar_one_or_none()
     assert archive is not None
     assert archive.summary_text == "summary text"
-
-    old_history = (
-        await session.execute(select(Message).where(Message.conversation_id == old.id))
-    ).scalar_one_or_none()
     assert old_history is None
-
-    new_history = (
-        await session.execute(select(Message).where(Message.conversation_id == active.id))
-    ).scalar_one_or_none()
     assert new_history is None
 
 
 @pytest.mark.asyncio
-async def test_handle_new_conversation_without_history(session):
+async def test_handle_new_conversation_without_history(session, plans, make_message, agent_mock):
     user = User(telegram_id=201, username="newcmd-empty", language_code="en")
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add_all([user, plan])
+    session.add(user)
     await session.flush()
 
-    class FakeAgent:
-        async def summarize_history(self, history):
-            return "should not be called"
+    message = make_message("/new", user.telegram_id)
+    await handle_new_conversation(message, session, agent=agent_mock, db_user=user)
 
-    message = DummyMessage("/new", DummyFromUser(user_id=user.telegram_id))
-    await handle_new_conversation(message, session, agent=FakeAgent(), db_user=user)
+    agent_mock.summarize_history.assert_not_awaited()
 
-    texts = [text for text, _ in message.answers]
-    assert len(texts) == 1
-    assert "fresh conversation" in texts[0]
+    assert len(message.answers) == 1
+    assert "fresh conversation" in message.answers[0]
 
-    conversations = (await session.execute(select(Conversation))).scalars().all()
+    conversations = (await session.scalars(select(Conversation))).all()
     assert len(conversations) == 2
     assert sum(1 for conv in conversations if conv.status == "active") == 1
 
-    archives = (await session.execute(select(ConversationArchive))).scalars().all()
+    archives = (await session.scalars(select(ConversationArchive))).all()
     assert len(archives) == 0
 
 
-@pytest.mark.asyncio
-async def test_handle_issue_card_success(session, monkeypatch):
-    free_plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    pro_plan = SubscriptionPlan(
-        code="PRO",
-        name="Pro",
-        description="",
-        hourly_message_limit=50,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-    )
-    admin_user = User(telegram_id=500, username="admin", language_code="en")
-    session.add_all([free_plan, pro_plan, admin_user])
-    await session.flush()
-
-    chat_router.settings.admin_telegram_id = admin_user.telegram_id
-    monkeypatch.setattr(chat_router, "_generate_card_code", lambda plan_code: f"{plan_code}-CARD")
-
-    message = DummyMessage("/issuecard PRO 15", DummyFromUser(user_id=admin_user.telegram_id))
-    await handle_issue_card(message, session, db_user=admin_user)
+async def _issued_card(session, code: str = "PRO-CARD") -> SubscriptionCard | None:
+    # Codes are deterministic in this module, so the card is found by its unique code.
+    stmt = select(SubscriptionCard).where(SubscriptionCard.code == code)
+    return (await session.execute(stmt)).scalar_one_or_none()
 
-    card = (await session.execute(select(SubscriptionCard))).scalars().first()
-    assert card is not None and card.plan_id == pro_plan.id
-    assert message.answers and "Card generated" in message.answers[0][0]
 
-
-@pytest.mark.asyncio
-async def test_handle_issue_card_defaults_duration(session, monkeypatch):
-    pro_plan = SubscriptionPlan(
-        code="PRO",
-        name="Pro",
-        description="",
-        hourly_message_limit=50,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-    )
-    admin_user = User(telegram_id=501, username="admin2", language_code="en")
-    session.add_all([pro_plan, admin_user])
-    await session.flush()
-
-    chat_router.settings.admin_telegram_id = admin_user.telegram_id
-    monkeypatch.setattr(chat_router, "_generate_card_code", lambda plan_code: f"{plan_code}-CARD2")
-
-    message = DummyMessage("/issuecard PRO", DummyFromUser(user_id=admin_user.telegram_id))
-    await handle_issue_card(message, session, db_user=admin_user)
-
-    card = (await session.execute(select(SubscriptionCard))).scalars().first()
-    assert card is not None
-    assert card.valid_days == chat_router.settings.subscriptions.subscription_duration_days
-
-
-@pytest.mark.asyncio
-async def test_handle_issue_card_unauthorized(session):
-    chat_router.settings.admin_telegram_id = 999
-    user = User(telegram_id=600, username="user", language_code="en")
-    session.add(user)
+@pytest_asyncio.fixture
+async def admin(session):
+    admin_user = User(telegram_id=500, username="admin", language_code="en")
+    session.add(admin_user)
     await session.flush()
+    return admin_user
 
-    message = DummyMessage("/issuecard PRO", DummyFromUser(user_id=user.telegram_id))
-    await handle_issue_card(message, session, db_user=user)
 
-    assert message.answers and message.answers[0][0] == "Unauthorized"
+@pytest.fixture
+def admin_settings(admin) -> FakeSettings:
+    return FakeSettings(admin_telegram_id=admin.telegram_id)
 
 
 @pytest.mark.asyncio
-async def test_handle_announce_requires_admin(session):
-    previous_admin = chat_router.settings.admin_telegram_id
-    chat_router.settings.admin_telegram_id = 4242
-    user = User(telegram_id=610, username="user", language_code="en")
-    session.add(user)
-    await session.flush()
-
-    message = DummyMessage("/announce hello", DummyFromUser(user_id=user.telegram_id))
-    try:
-        await handle_announce(message, session, db_user=user)
-    finally:
-        chat_router.settings.admin_telegram_id = previous_admin
-
-    assert message.answers and message.answers[0][0] == "Unauthorized"
+@pytest.mark.parametrize(
+    ("text", "from_admin", "valid_days"),
+    [
+        ("/issuecard PRO 15", True, 15),
+        ("/issuecard PRO", True, None),
+        ("/issuecard PRO", False, None),
+    ],
+    ids=["explicit-days", "default-days", "unauthorized"],
+)
+async def test_handle_issue_card(
+    session, plans, admin, admin_settings, text, from_admin, valid_days, make_message
+):
+    sender = admin
+    if not from_admin:
+        sender = User(telegram_id=600, username="user", language_code="en")
+        session.add(sender)
+        await session.flush()
+
+    message = make_message(text, sender.telegram_id)
+    await handle_issue_card(message, session, db_user=sender, settings=admin_settings)
+
+    card = await _issued_card(session)
+    if not from_admin:
+        assert card is None
+        assert message.answers and message.answers[0] == "Unauthorized"
+        return
+
+    assert card is not None and card.plan_id == plans["PRO"].id
+    assert card.code == "PRO-CARD"
+    expected_days = valid_days or admin_settings.subscriptions.subscription_duration_days
+    assert card.valid_days == expected_days
+    assert message.answers and "Card generated" in message.answers[0]
 
 
 @pytest.mark.asyncio
-async def test_handle_announce_broadcasts(session, monkeypatch):
-    previous_admin = chat_router.settings.admin_telegram_id
-    admin = User(telegram_id=700, username="admin", language_code="en")
+@pytest.mark.parametrize(
+    ("from_admin", "expected_answer"),
+    [(True, "Announcement sent to 2 users."), (False, "Unauthorized")],
+    ids=["admin", "unauthorized"],
+)
+async def test_handle_announce(
+    session, admin, admin_settings, monkeypatch, make_message, from_admin, expected_answer
+):
     active_user = User(telegram_id=701, username="active", language_code="en")
     pending_user = User(telegram_id=702, username="pending", language_code="en", status="pending")
     blocked_user = User(telegram_id=703, username="blocked", language_code="en", status="blocked")
-    session.add_all([admin, active_user, pending_user, blocked_user])
+    session.add_all([active_user, pending_user, blocked_user])
     await session.flush()
 
-    chat_router.settings.admin_telegram_id = admin.telegram_id
     sent_messages: list[tuple[int, str]] = []
 
     async def fake_send(bot, *, chat_id: int, text: str, parse_mode=None):  # type: ignore[override]
@@ -470,17 +353,18 @@ async def test_handle_announce_broadcasts(session, monkeypatch):
 
     monkeypatch.setattr(chat_router, "bot_send_with_retry", fake_send)
 
-    message = DummyMessage("/announce Maintenance window", DummyFromUser(user_id=admin.telegram_id))
+    sender = admin if from_admin else active_user
+    message = make_message("/announce Maintenance window", sender.telegram_id)
     message.bot = object()
-
-    try:
-        await handle_announce(message, session, db_user=admin)
-    finally:
-        chat_router.settings.admin_telegram_id = previous_admin
-
-    assert sent_messages == [
-        (active_user.telegram_id, "Maintenance window"),
-        (pending_user.telegram_id, "Maintenance window"),
-    ]
-    assert message.answers
-    assert "Announcement sent to 2 users." in message.answers[0][0]
+    await handle_announce(message, session, db_user=sender, settings=admin_settings)
+
+    expected_sent = (
+        [
+            (active_user.telegram_id, "Maintenance window"),
+            (pending_user.telegram_id, "Maintenance window"),
+        ]
+        if from_admin
+        else []
+    )
+    assert sent_messages == expected_sent
+    assert message.answers and message.answers[0] == expected_answer
@@ -7,6 +7,7 @@ from types import SimpleNamespace
 import pytest
 from sqlalchemy import select
 from pydantic_ai.messages import (
+    ModelMessagesTypeAdapter,
     ModelRequest,
     ModelResponse,
     TextPart,
@@ -22,13 +23,18 @@ from app.services.conversations import ConversationService
 
 
 def _make_messages(pair_count: int = 3):
-    messages: list = []
-    for idx in range(pair_count):
-        messages.append(
-            ModelRequest(parts=[UserPromptPart(content=f"user message {idx}")])
+    return [
+        message
+        for idx in range(pair_count)
+        for message in (
+            ModelRequest(parts=[UserPromptPart(content=f"user message {idx}")]),
+            ModelResponse(parts=[TextPart(content=f"bot reply {idx}")]),
         )
-        messages.append(ModelResponse(parts=[TextPart(content=f"bot reply {idx}")]))
-    return messages
+    ]
+
+
+# Built once: validating the dumped form is cheaper than constructing 30 messages per run.
+_ARCHIVE_HISTORY_DUMP = ModelMessagesTypeAdapter.dump_python(_make_messages(pair_count=15))
 
 
 class DummyResult:
@@ -43,6 +49,11 @@ class DummyResult:
         return self._usage
 
 
+@pytest.fixture
+def service(session) -> ConversationService:
+    return ConversationService(session)
+
+
 async def _bootstrap_user(session) -> User:
     user = User(telegram_id=1111, username="tester")
     session.add(user)
@@ -51,8 +62,7 @@ async def _bootstrap_user(session) -> User:
 
 
 @pytest.mark.asyncio
-async def test_get_or_create_conversation_is_idempotent(session):
-    service = ConversationService(session)
+async def test_get_or_create_conversation_is_idempotent(service, session):
     user = await _bootstrap_user(session)
 
     first = await service.get_or_create_active_conversation(user)
@@ -62,12 +72,12 @@ async def test_get_or_create_conversation_is_idempotent(session):
 
 
 @pytest.mark.asyncio
-async def test_process_agent_result_archives_when_threshold_exceeded(session, monkeypatch):
-    service = ConversationService(session)
+@pytest.mark.slow
+async def test_process_agent_result_archives_when_threshold_exceeded(service, session, monkeypatch):
     user = await _bootstrap_user(session)
     conversation = await service.get_or_create_active_conversation(user)
 
-    messages = _make_messages(pair_count=15)
+    messages = ModelMessagesTypeAdapter.validate_python(_ARCHIVE_HISTORY_DUMP)
     result = DummyResult(messages, total_tokens=200)
 
     monkeypatch.setattr(conversations_module, "ARCHIVE_TOKEN_THRESHOLD", 50)
@@ -95,8 +105,7 @@ async def test_process_agent_result_archives_when_threshold_exceeded(session, mo
 
 
 @pytest.mark.asyncio
-async def test_process_agent_result_updates_history_without_archive(session, monkeypatch):
-    service = ConversationService(session)
+async def test_process_agent_result_updates_history_without_archive(service, session, monkeypatch):
     user = await _bootstrap_user(session)
     conversation = await service.get_or_create_active_conversation(user)
 
@@ -121,8 +130,8 @@ async def test_process_agent_result_updates_history_without_archive(session, mon
 
 
 @pytest.mark.asyncio
-async def test_trimmed_history_preserves_tool_context(session, monkeypatch):
-    service = ConversationService(session)
+@pytest.mark.slow
+async def test_trimmed_history_preserves_tool_context(service, session, monkeypatch):
     user = await _bootstrap_user(session)
     conversation = await service.get_or_create_active_conversation(user)
 
@@ -161,8 +170,7 @@ async def test_trimmed_history_preserves_tool_context(session, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_store_manual_history(session):
-    service = ConversationService(session)
+async def test_store_manual_history(service, session):
     user = await _bootstrap_user(session)
     conversation = await service.get_or_create_active_conversation(user)
 
@@ -175,8 +183,7 @@ async def test_store_manual_history(session):
 
 
 @pytest.mark.asyncio
-async def test_estimate_tokens_includes_tool_payload(session, monkeypatch):
-    service = ConversationService(session)
+async def test_estimate_tokens_includes_tool_payload(service, monkeypatch):
     captured: dict[str, str] = {}
 
     def fake_estimate(text: str) -> int:
@@ -201,8 +208,7 @@ async def test_estimate_tokens_includes_tool_payload(session, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_estimate_tokens_includes_system_prompt(session, monkeypatch):
-    service = ConversationService(session)
+async def test_estimate_tokens_includes_system_prompt(service, monkeypatch):
     captured: dict[str, str] = {}
 
     def fake_estimate(text: str) -> int:
@@ -2,31 +2,36 @@
 
 from __future__ import annotations
 
+from unittest.mock import AsyncMock
+
 import pytest
 
 from app.bot.middlewares.db_session import DbSessionMiddleware
 
 
-class DummyDatabase:
+class _SessionWrapper:
+    __slots__ = ("session",)
+
     def __init__(self, session):
-        self._session = session
+        self.session = session
 
-    def session(self):
-        class _Wrapper:
-            def __init__(self, session):
-                self.session = session
+    async def __aenter__(self):
+        return self.session
 
-            async def __aenter__(self):
-                return self.session
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
 
-            async def __aexit__(self, exc_type, exc, tb):
-                pass
 
-        return _Wrapper(self._session)
+class DummyDatabase:
+    def __init__(self, session):
+        self._session = session
+
+    def session(self):
+        return _SessionWrapper(self._session)
 
 
 @pytest.mark.asyncio
-async def test_db_session_middleware_commits(monkeypatch, session):
+async def test_db_session_middleware_commits(session):
     middleware = DbSessionMiddleware(DummyDatabase(session))
     called = {}
 
@@ -42,24 +47,13 @@ async def test_db_session_middleware_commits(monkeypatch, session):
 
 @pytest.mark.asyncio
 async def test_db_session_middleware_rolls_back(monkeypatch, session):
-    class ExplodingDatabase(DummyDatabase):
-        def session(self):
-            class _Wrapper:
-                def __init__(self, session):
-                    self.session = session
-
-                async def __aenter__(self):
-                    return self.session
-
-                async def __aexit__(self, exc_type, exc, tb):
-                    pass
-
-            return _Wrapper(self._session)
-
-    middleware = DbSessionMiddleware(ExplodingDatabase(session))
+    rollback = AsyncMock()
+    monkeypatch.setattr(session, "rollback", rollback)
+    middleware = DbSessionMiddleware(DummyDatabase(session))
 
     async def handler(event, data):
         raise RuntimeError("boom")
 
     with pytest.raises(RuntimeError):
         await middleware(handler, object(), {})
+    rollback.assert_awaited_once()
@@ -11,58 +11,46 @@ from aiogram.types import Chat, ErrorEvent, Message, Update, User
 from app.services.error_monitor import ErrorMonitor
 
 
-class DummyBot:
-    def __init__(self) -> None:
-        self.sent_messages = []
-
-    async def send_message(self, chat_id, text, parse_mode=None):
-        self.sent_messages.append(
-            {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": parse_mode,
-            }
-        )
-
-
-def _make_update() -> Update:
-    chat = Chat(id=999, type="private", title="Diagnostics")
-    user = User(id=123, is_bot=False, first_name="Test", last_name="User", username="tester")
-    message = Message(
+_CHAT = Chat(id=999, type="private", title="Diagnostics")
+_USER = User(id=123, is_bot=False, first_name="Test", last_name="User", username="tester")
+
+
+@pytest.fixture(scope="module")
+def sample_update() -> Update:
+    # The chat and user are validated once above; the wrappers skip revalidation.
+    message = Message.model_construct(
         message_id=1,
         date=datetime.now(timezone.utc),
-        chat=chat,
-        from_user=user,
+        chat=_CHAT,
+        from_user=_USER,
         text="hello",
     )
-    return Update(update_id=77, message=message)
+    return Update.model_construct(update_id=77, message=message)
 
 
 @pytest.mark.asyncio
-async def test_error_monitor_skips_without_admin():
+async def test_error_monitor_skips_without_admin(dummy_bot, sample_update):
     settings = SimpleNamespace(admin_telegram_id=None, environment="test")
     monitor = ErrorMonitor(settings)
-    bot = DummyBot()
-    event = ErrorEvent(update=_make_update(), exception=RuntimeError("boom"))
+    event = ErrorEvent(update=sample_update, exception=RuntimeError("boom"))
 
-    result = await monitor.handle_error(event, bot)
+    result = await monitor.handle_error(event, dummy_bot)
 
     assert result is UNHANDLED
-    assert bot.sent_messages == []
+    assert dummy_bot.sent_messages == []
 
 
 @pytest.mark.asyncio
-async def test_error_monitor_sends_notification():
+async def test_error_monitor_sends_notification(dummy_bot, sample_update):
     settings = SimpleNamespace(admin_telegram_id=555, environment="prod")
     monitor = ErrorMonitor(settings)
-    bot = DummyBot()
-    event = ErrorEvent(update=_make_update(), exception=ValueError("bad input"))
+    event = ErrorEvent(update=sample_update, exception=ValueError("bad input"))
 
-    result = await monitor.handle_error(event, bot)
+    result = await monitor.handle_error(event, dummy_bot)
 
     assert result is UNHANDLED
-    assert len(bot.sent_messages) == 1
-    payload = bot.sent_messages[0]
+    assert len(dummy_bot.sent_messages) == 1
+    payload = dummy_bot.sent_messages[0]
     assert payload["chat_id"] == 555
     assert payload["parse_mode"] is None
     assert "ValueError" in payload["text"]
@@ -1,30 +1,19 @@
 from __future__ import annotations
 
-from typing import Any
-
 import pytest
 import httpx
 from pydantic import SecretStr
 
+from _factories import DummyResponse, SnapshotClient
 from app.config import ExternalToolSettings
 from app.services.external_tools import MarketDataService, SearchService, ToolServiceError
 
 
-class DummyResponse:
-    def __init__(self):
-        self.status_code = 200
-        self.text = "{}"
-        self.headers = {}
-
-    def raise_for_status(self):
-        return None
-
-    def json(self):
-        return {
-            "search_metadata": {},
-            "search_parameters": {},
-            "organic_results": ["ok"],
-        }
+_SEARCH_PAYLOAD = {
+    "search_metadata": {},
+    "search_parameters": {},
+    "organic_results": ["ok"],
+}
 
 
 class FlakyClient:
@@ -35,16 +24,11 @@ class FlakyClient:
         self.calls += 1
         if self.calls < 3:
             raise httpx.RequestError("boom", request=httpx.Request("GET", "https://serpapi.com/search"))
-        return DummyResponse()
+        return DummyResponse(_SEARCH_PAYLOAD)
 
 
 @pytest.mark.asyncio
-async def test_search_service_retries(monkeypatch):
-    async def _noop_sleep(delay):
-        return None
-
-    monkeypatch.setattr("app.utils.retry.asyncio.sleep", _noop_sleep)
-
+async def test_search_service_retries(no_retry_backoff):
     settings = ExternalToolSettings(serpapi_api_key=SecretStr("key"))
     client = FlakyClient()
     service = SearchService(client, settings=settings)
@@ -54,29 +38,26 @@ async def test_search_service_retries(monkeypatch):
     assert result["organic_results"] == ["ok"]
 
 
-class DummySnapshotClient:
-    def __init__(self, payload: dict[str, Any]):
-        self.payload = payload
-        self.calls: list[dict[str, Any]] = []
-
-    async def get(self, url, params=None, timeout=None):
-        self.calls.append({"url": url, "params": params, "timeout": timeout})
-
-        class _Response:
-            status_code = 200
-            text = "{}"
-            headers = {}
+class RejectingClient:
+    def __init__(self):
+        self.calls = 0
 
-            def __init__(self, payload):
-                self._payload = payload
+    async def get(self, *args, **kwargs):
+        self.calls += 1
+        request = httpx.Request("GET", "https://serpapi.com/search")
+        response = httpx.Response(401, request=request, text="invalid key")
+        raise httpx.HTTPStatusError("unauthorized", request=request, response=response)
 
-            def raise_for_status(self):
-                return None
 
-            def json(self):
-                return self._payload
+@pytest.mark.asyncio
+async def test_search_service_does_not_retry_client_errors():
+    settings = ExternalToolSettings(serpapi_api_key=SecretStr("key"))
+    client = RejectingClient()
+    service = SearchService(client, settings=settings)
 
-        return _Response(self.payload)
+    with pytest.raises(ToolServiceError):
+        await service.google_search("hello")
+    assert client.calls == 1
 
 
 @pytest.mark.asyncio
@@ -96,7 +77,7 @@ async def test_market_data_service_filters_and_limits():
         },
     }
     settings = ExternalToolSettings()
-    client = DummySnapshotClient(payload)
+    client = SnapshotClient(payload)
     service = MarketDataService(client, settings=settings)
 
     result = await service.query_snapshots(["nvda", "btc", "eth"], limit=1)
@@ -112,7 +93,7 @@ async def test_market_data_service_filters_and_limits():
 @pytest.mark.asyncio
 async def test_market_data_service_requires_secret():
     settings = ExternalToolSettings()
-    client = DummySnapshotClient({})
+    client = SnapshotClient({})
     service = MarketDataService(client, settings=settings)
 
     with pytest.raises(ToolServiceError):
@@ -25,3 +25,24 @@ def test_gettext_falls_back_to_default(tmp_path: Path):
 
     assert service.gettext("greet", locale="es") == "Hello"
     assert service.gettext("missing.key") == "missing.key"
+
+
+def test_gettext_shares_cache_across_instances(tmp_path: Path):
+    locale_dir = tmp_path / "locales"
+    locale_dir.mkdir()
+    locale_file = locale_dir / "en.json"
+    locale_file.write_text('{"greet": "Hello"}', encoding="utf-8")
+    assert I18nService(locales_path=locale_dir).gettext("greet") == "Hello"
+
+    # A fresh instance (as handlers create per update) must not re-read the file.
+    locale_file.write_text('{"greet": "Changed"}', encoding="utf-8")
+    assert I18nService(locales_path=locale_dir).gettext("greet") == "Hello"
+
+
+def test_gettext_keeps_unknown_placeholders(tmp_path: Path):
+    locale_dir = tmp_path / "locales"
+    locale_dir.mkdir()
+    (locale_dir / "en.json").write_text('{"greet": "Hello {name}, {mood}"}', encoding="utf-8")
+    service = I18nService(locales_path=locale_dir)
+
+    assert service.gettext("greet", name="World") == "Hello World, {mood}"
@@ -7,9 +7,11 @@ from types import SimpleNamespace
 
 import pytest
 
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
 from sqlalchemy import select
 
-from app.db.models.core import ConversationArchive, SubscriptionCard, SubscriptionPlan, User
+from _factories import free_plan, make_user, pro_plan, subscription_settings
+from app.db.models.core import ConversationArchive, SubscriptionCard, User
 from app.services.conversations import ConversationService
 from app.services.memory import MemoryService
 from app.services.rate_limit import RateLimiter
@@ -18,33 +20,22 @@ from app.services.exceptions import RateLimitExceeded
 from app.utils.datetime import utc_now
 
 
-def _settings(subscription_duration_days: int = 30) -> SimpleNamespace:
-    return SimpleNamespace(subscriptions=SimpleNamespace(subscription_duration_days=subscription_duration_days))
+async def _bootstrap_user_and_plans(session) -> tuple[User, SubscriptionCard]:
+    """Create the user, FREE/PRO plans and an unredeemed PRO card in one flush."""
 
-
-async def _bootstrap_user_and_plans(session) -> User:
-    user = User(telegram_id=9999, username="integration")
-    free_plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="Free tier",
-        hourly_message_limit=5,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    pro_plan = SubscriptionPlan(
-        code="PRO",
-        name="Pro",
-        description="Pro tier",
-        hourly_message_limit=20,
-        monthly_price=5.0,
-        priority=10,
-        is_default=False,
+    user = make_user(9999, username="integration")
+    free = free_plan(description="Free tier", hourly_message_limit=5)
+    pro = pro_plan(description="Pro tier", hourly_message_limit=20, monthly_price=5.0, priority=10)
+    card = SubscriptionCard(
+        code="PRO-CARD",
+        plan=pro,
+        status="new",
+        valid_days=15,
+        expires_at=utc_now() + timedelta(days=30),
     )
-    session.add_all([user, free_plan, pro_plan])
+    session.add_all([user, free, pro, card])
     await session.flush()
-    return user
+    return user, card
 
 
 class DummyResult:
@@ -59,47 +50,31 @@ class DummyResult:
         return self._usage
 
 
-def _messages():
-    from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
-
-    return [
+@pytest.fixture(scope="session")
+def message_pair() -> tuple[ModelRequest, ModelResponse]:
+    return (
         ModelRequest(parts=[UserPromptPart(content="hello " * 10)]),
         ModelResponse(parts=[TextPart(content="world " * 10)]),
-    ]
+    )
 
 
 @pytest.mark.asyncio
-async def test_end_to_end_subscription_quota_and_memory_flow(session, monkeypatch):
-    user = await _bootstrap_user_and_plans(session)
-    subscription_service = SubscriptionService(session, settings=_settings())
+async def test_end_to_end_subscription_quota_and_memory_flow(session, monkeypatch, message_pair):
+    user, card = await _bootstrap_user_and_plans(session)
+    subscription_service = SubscriptionService(session, settings=subscription_settings())
 
     # Default FREE plan is provisioned automatically
     hourly_limit = await subscription_service.get_hourly_limit(user)
     assert hourly_limit == 5
 
-    pro_plan = (
-        await session.execute(select(SubscriptionPlan).where(SubscriptionPlan.code == "PRO"))
-    ).scalar_one()
-
     # Redeem PRO card to upgrade subscription
-    card = SubscriptionCard(
-        code="PRO-CARD",
-        plan_id=pro_plan.id,
-        status="new",
-        valid_days=15,
-        expires_at=utc_now() + timedelta(days=30),
-    )
-    session.add(card)
-    await session.flush()
-
     await subscription_service.redeem_card(user, card.code)
     hourly_limit = await subscription_service.get_hourly_limit(user)
     assert hourly_limit == 20
 
     # Rate limiting honours upgraded plan and cleans old windows
-    limiter = RateLimiter(session, retention_hours=1)
-    for _ in range(hourly_limit):
-        await limiter.increment(user, hourly_limit)
+    limiter = RateLimiter(session)
+    await limiter.increment(user, hourly_limit, increment_messages=hourly_limit)
     with pytest.raises(RateLimitExceeded):
         await limiter.increment(user, hourly_limit)
 
@@ -107,7 +82,7 @@ async def test_end_to_end_subscription_quota_and_memory_flow(session, monkeypatc
     conversation_service = ConversationService(session)
     conversation = await conversation_service.get_or_create_active_conversation(user)
 
-    result = DummyResult(_messages() * 15, total_tokens=1000)
+    result = DummyResult(list(message_pair) * 15, total_tokens=1000)
     monkeypatch.setattr("app.services.conversations.ARCHIVE_TOKEN_THRESHOLD", 50)
     async def summarizer(history):
         return f"summary({len(history)})"
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
+from unittest.mock import patch
 
 import pytest
 import structlog
@@ -45,6 +46,7 @@ class DummyDispatcher:
         self.started = False
         self.update = SimpleNamespace(outer_middleware=self.outer_middlewares.append)
         self.message = SimpleNamespace(middleware=self.message_middlewares.append)
+        self.message_reaction = SimpleNamespace(middleware=self.message_middlewares.append)
         self.registered_error_handlers = []
         self.errors = SimpleNamespace(register=self.register_error)
 
@@ -70,6 +72,9 @@ class DummyDatabase:
         self.session_calls += 1
         yield SimpleNamespace()
 
+    async def monitor_pool(self):
+        return None
+
 
 class DummyAgent:
     def __init__(self, settings) -> None:
@@ -77,7 +82,7 @@ class DummyAgent:
 
 
 @pytest.mark.asyncio
-async def test_main_bootstrap(monkeypatch):
+async def test_main_bootstrap():
     dummy_llm = DummyLLM()
     settings = SimpleNamespace(
         llm=dummy_llm,
@@ -114,31 +119,34 @@ async def test_main_bootstrap(monkeypatch):
     async def fake_ensure(session, ensure_settings):
         seed_calls["called"] = (session, ensure_settings)
 
-    monkeypatch.setattr(main_module, "configure_logging", lambda: None)
-    monkeypatch.setattr(main_module, "get_settings", lambda: settings)
-    monkeypatch.setattr(main_module, "Bot", lambda *args, **kwargs: SimpleNamespace())
-    monkeypatch.setattr(main_module, "Dispatcher", lambda: dummy_dispatcher)
-    monkeypatch.setattr(main_module, "Database", lambda settings: dummy_database)
-    monkeypatch.setattr(main_module, "ensure_subscription_plans", fake_ensure)
-    monkeypatch.setattr(main_module, "AgentOrchestrator", DummyAgent)
     dummy_media_service = object()
-    monkeypatch.setattr(main_module, "MediaCaptionService", lambda settings: dummy_media_service)
-    monkeypatch.setattr(main_module, "DbSessionMiddleware", _capture("db"))
-    monkeypatch.setattr(main_module, "ThrottleMiddleware", _capture("throttle"))
-    monkeypatch.setattr(main_module, "UserContextMiddleware", lambda: "userctx")
-    monkeypatch.setattr(main_module, "RateLimitMiddleware", _capture("rate"))
-    dummy_monitor = object()
-    monkeypatch.setattr(main_module, "ErrorMonitor", lambda settings: dummy_monitor)
-    monkeypatch.setattr(main_module, "setup_routers", lambda: "router")
-
-    await main_module.main()
+    dummy_monitor = SimpleNamespace(handle_error=object())
+    overrides = {
+        "configure_logging": lambda: None,
+        "get_settings": lambda: settings,
+        "Bot": lambda *args, **kwargs: SimpleNamespace(),
+        "Dispatcher": lambda: dummy_dispatcher,
+        "Database": lambda settings: dummy_database,
+        "ensure_subscription_plans": fake_ensure,
+        "AgentOrchestrator": DummyAgent,
+        "MediaCaptionService": lambda settings: dummy_media_service,
+        "DbSessionMiddleware": _capture("db"),
+        "ThrottleMiddleware": _capture("throttle"),
+        "UserContextMiddleware": lambda: "userctx",
+        "RateLimitMiddleware": _capture("rate"),
+        "ErrorMonitor": lambda settings: dummy_monitor,
+        "setup_routers": lambda: "router",
+    }
+
+    with patch.multiple(main_module, **overrides):
+        await main_module.main()
 
     assert dummy_llm.applied is True
     assert dummy_database.session_calls == 1
     assert "called" in seed_calls
     assert dummy_dispatcher.started is True
     assert dummy_dispatcher.included == ["router"]
-    assert dummy_dispatcher.registered_error_handlers == [dummy_monitor]
+    assert dummy_dispatcher.registered_error_handlers == [dummy_monitor.handle_error]
     assert middleware_inits["db"][0][0] is dummy_database
     assert middleware_inits["throttle"][0][0] is settings
     assert middleware_inits["rate"][0][0] is settings
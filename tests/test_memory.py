@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
+
 import pytest
-from sqlalchemy import select
 
 from app.db.models.core import Conversation, LongTermMemory, MemoryChunk, Message, User
 from app.services.memory import MemoryService
 
 
-async def _bootstrap_conversation(session):
+def _make_conversation() -> tuple[User, Conversation]:
     user = User(telegram_id=2222, username="mem-user")
-    conversation = Conversation(user=user, title="Mem", context_tokens=0, status="active")
+    return user, Conversation(user=user, title="Mem", context_tokens=0, status="active")
+
+
+async def _bootstrap_conversation(session):
+    user, conversation = _make_conversation()
     session.add_all([user, conversation])
     await session.flush()
     return user, conversation
@@ -38,24 +43,44 @@ async def test_create_and_fetch_memories(session):
     memories = await service.fetch_relevant_memories(user.id, limit=1)
     assert memories[0].id == mem2.id
 
-    stmt = select(LongTermMemory).where(LongTermMemory.id == mem1.id)
-    stored = (await session.execute(stmt)).scalar_one()
+    stored = await session.get(LongTermMemory, mem1.id)
     assert stored.content == "first"
 
 
 @pytest.mark.asyncio
-async def test_flag_chunk_for_compression(session):
+async def test_iter_relevant_memories_matches_fetch(session):
     service = MemoryService(session)
     user, conversation = await _bootstrap_conversation(session)
+    base = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    for index in range(4):
+        memory = await service.create_memory(
+            user_id=user.id,
+            conversation_id=conversation.id,
+            source_message=None,
+            content=f"fact {index}",
+        )
+        memory.updated_at = base + timedelta(minutes=index)
+    await session.flush()
+
+    fetched = await service.fetch_relevant_memories(user.id, limit=3)
+    streamed = [memory async for memory in service.iter_relevant_memories(user.id, limit=3)]
 
+    assert [memory.content for memory in fetched] == ["fact 3", "fact 2", "fact 1"]
+    assert [memory.id for memory in streamed] == [memory.id for memory in fetched]
+
+
+@pytest.mark.asyncio
+async def test_flag_chunk_for_compression(session):
+    service = MemoryService(session)
+    user, conversation = _make_conversation()
     start_msg = Message(
-        conversation_id=conversation.id,
-        user_id=user.id,
+        conversation=conversation,
+        user=user,
         history=[],
         total_tokens=10,
         message_count=1,
     )
-    session.add(start_msg)
+    session.add_all([user, conversation, start_msg])
     await session.flush()
 
     chunk = await service.flag_chunk_for_compression(
@@ -65,7 +90,7 @@ async def test_flag_chunk_for_compression(session):
         token_count=42,
     )
 
-    stmt = select(MemoryChunk).where(MemoryChunk.id == chunk.id)
-    stored = (await session.execute(stmt)).scalar_one()
+    stored = await session.get(MemoryChunk, chunk.id)
     assert stored.state == "needs_compress"
     assert stored.token_count == 42
+
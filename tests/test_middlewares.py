@@ -9,44 +9,20 @@ import pytest
 from sqlalchemy import select
 from aiogram.enums import MessageEntityType
 
+from _factories import DummyMessage, subscription_settings
 from app.bot.middlewares.rate_limit import RateLimitMiddleware
 from app.bot.middlewares.throttle import ThrottleMiddleware
 from app.bot.middlewares.user_context import UserContextMiddleware
-from app.bot.routers import chat as chat_router
 from app.bot.routers.chat import handle_start
 from app.db.models.core import SubscriptionPlan, User, UserSubscription
 from app.utils.datetime import utc_now
 
 
-class DummyFromUser:
-    def __init__(self, user_id: int = 1, full_name: str = "Test User", language_code: str = "en") -> None:
-        self.id = user_id
-        self.username = f"user{user_id}"
-        self.first_name = full_name.split()[0]
-        self.last_name = "".join(full_name.split()[1:]) or "User"
-        self.language_code = language_code
-        self.full_name = full_name
-
-
-class DummyMessage:
-    def __init__(self, text: str = "hi", from_user: DummyFromUser | None = None) -> None:
-        self.text = text
-        self.from_user = from_user or DummyFromUser()
-        self.entities = []
-        self.caption_entities = []
-        self.answers: list[tuple[str, str | None]] = []
-        self.chat = SimpleNamespace(type="private")
-
-    async def answer(self, text: str, parse_mode: str | None = None):
-        self.answers.append((text, parse_mode))
-        return text
-
-
 @pytest.fixture(autouse=True)
 def stub_subscription_settings(monkeypatch):
     import app.services.subscriptions as subs_module
 
-    settings = SimpleNamespace(subscriptions=SimpleNamespace(subscription_duration_days=30))
+    settings = subscription_settings()
     monkeypatch.setattr(subs_module, "get_settings", lambda: settings)
     return settings
 
@@ -55,27 +31,19 @@ def stub_subscription_settings(monkeypatch):
 def patch_aiogram_message(monkeypatch):
     from app.bot.middlewares import throttle as throttle_module
     from app.bot.middlewares import rate_limit as rate_module
+    from app.bot.middlewares import user_context as user_context_module
 
     monkeypatch.setattr(throttle_module, "Message", DummyMessage)
     monkeypatch.setattr(rate_module, "Message", DummyMessage)
+    monkeypatch.setattr(user_context_module, "Message", DummyMessage)
 
 
 @pytest.mark.asyncio
-async def test_user_context_creates_user_and_subscription(session):
+async def test_user_context_creates_user_and_subscription(session, plans, make_message):
     middleware = UserContextMiddleware()
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add(plan)
-    await session.flush()
+    plan = plans["FREE"]
 
-    message = DummyMessage(from_user=DummyFromUser(user_id=10, full_name="New User"))
+    message = make_message(user_id=10, full_name="New User")
     data = {"session": session}
     handled = {}
 
@@ -88,26 +56,19 @@ async def test_user_context_creates_user_and_subscription(session):
     assert "db_user" in handled
     user = handled["db_user"]
     assert user.telegram_id == 10
-    subs = (await session.execute(select(UserSubscription))).scalars().all()
+    subs = (
+        await session.scalars(select(UserSubscription).where(UserSubscription.user_id == user.id))
+    ).all()
     assert subs and subs[0].plan_id == plan.id
 
 
 @pytest.mark.asyncio
-async def test_user_context_blocks_group_chat(session):
+@pytest.mark.parametrize("is_reply", [True, False], ids=["reply", "plain"])
+async def test_user_context_blocks_group_chat(session, make_message, is_reply):
     middleware = UserContextMiddleware()
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    session.add(plan)
-    await session.flush()
 
-    message = DummyMessage(from_user=DummyFromUser(user_id=11))
+    original = make_message("earlier", user_id=12)
+    message = make_message(user_id=11, reply_to_message=original if is_reply else None)
     message.chat = SimpleNamespace(type="group")
     data = {"session": session}
 
@@ -116,38 +77,29 @@ async def test_user_context_blocks_group_chat(session):
 
     await middleware(handler, message, data)
 
-    assert message.answers
-    assert "private chat" in message.answers[-1][0]
+    # Replies are answered on the replied-to message, anything else on the message itself.
+    answered = original if is_reply else message
+    assert answered.answers
+    assert "private chat" in answered.answers[-1]
 
 
 @pytest.mark.asyncio
-async def test_user_context_expires_outdated_subscriptions(session):
+async def test_user_context_expires_outdated_subscriptions(session, plans, make_message):
     middleware = UserContextMiddleware()
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
+    plan = plans["FREE"]
     user = User(telegram_id=12_345, username="expired", language_code="en")
-    session.add_all([plan, user])
-    await session.flush()
-
     expired_sub = UserSubscription(
-        user_id=user.id,
+        user=user,
         plan_id=plan.id,
         status="active",
         priority=plan.priority,
         starts_at=utc_now() - timedelta(days=10),
         expires_at=utc_now() - timedelta(days=1),
     )
-    session.add(expired_sub)
+    session.add_all([user, expired_sub])
     await session.flush()
 
-    message = DummyMessage(from_user=DummyFromUser(user_id=user.telegram_id))
+    message = make_message(user_id=user.telegram_id)
     data = {"session": session}
 
     async def handler(event, ctx):
@@ -155,19 +107,15 @@ async def test_user_context_expires_outdated_subscriptions(session):
 
     await middleware(handler, message, data)
 
-    refreshed = (
-        await session.execute(
-            select(UserSubscription).where(UserSubscription.id == expired_sub.id)
-        )
-    ).scalar_one()
+    refreshed = await session.get(UserSubscription, expired_sub.id)
     assert refreshed.status == "expired"
 
 
 @pytest.mark.asyncio
-async def test_throttle_blocks_excess_requests():
+async def test_throttle_blocks_excess_requests(make_message):
     settings = SimpleNamespace(request_limit=SimpleNamespace(interval_seconds=60, max_requests=1))
     middleware = ThrottleMiddleware(settings)
-    message = DummyMessage(text="/start")
+    message = make_message("/start")
     handled = []
 
     async def handler(event, data):
@@ -179,22 +127,18 @@ async def test_throttle_blocks_excess_requests():
 
     await middleware(handler, message, {})
     assert len(handled) == 1
-    assert message.answers[-1][0].startswith("Too many")
+    assert message.answers[-1].startswith("Too many")
 
 
 @pytest.mark.asyncio
-async def test_rate_limit_middleware_blocks_after_limit(session, stub_subscription_settings):
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=1,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
+async def test_rate_limit_middleware_blocks_after_limit(
+    session, plans, stub_subscription_settings, make_message
+):
+    # Tighten the shared default plan for this test only; the change is rolled back.
+    plan = await session.get(SubscriptionPlan, plans["FREE"].id)
+    plan.hourly_message_limit = 1
     user = User(telegram_id=77, username="limit_user", language_code="en")
-    session.add_all([plan, user])
+    session.add(user)
     await session.flush()
 
     settings = SimpleNamespace(
@@ -203,7 +147,7 @@ async def test_rate_limit_middleware_blocks_after_limit(session, stub_subscripti
         subscriptions=stub_subscription_settings.subscriptions,
     )
     middleware = RateLimitMiddleware(settings)
-    message = DummyMessage(text="hello", from_user=DummyFromUser(user_id=user.telegram_id))
+    message = make_message("hello", user.telegram_id)
     handled = []
 
     async def handler(event, data):
@@ -217,46 +161,25 @@ async def test_rate_limit_middleware_blocks_after_limit(session, stub_subscripti
 
     await middleware(handler, message, data)
     assert len(handled) == 1
-    assert message.answers[-1][0].startswith("Hourly quota")
+    assert message.answers[-1].startswith("Hourly quota")
 
 
 @pytest.mark.asyncio
-async def test_handle_start_uses_subscription_plan(session, monkeypatch, stub_subscription_settings):
-    free_plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    pro_plan = SubscriptionPlan(
-        code="PRO",
-        name="Pro",
-        description="",
-        hourly_message_limit=50,
-        monthly_price=10.0,
-        priority=10,
-        is_default=False,
-    )
+async def test_handle_start_uses_subscription_plan(
+    session, plans, stub_subscription_settings, make_message
+):
+    pro_plan = plans["PRO"]
     user = User(telegram_id=999, username="pro_user", language_code="en")
-    session.add_all([free_plan, pro_plan, user])
-    await session.flush()
-
     subscription = UserSubscription(
-        user_id=user.id,
+        user=user,
         plan_id=pro_plan.id,
         status="active",
     )
-    session.add(subscription)
+    session.add_all([user, subscription])
     await session.flush()
 
-    chat_settings = SimpleNamespace(default_language="en")
-    monkeypatch.setattr(chat_router, "settings", chat_settings)
-
-    message = DummyMessage(text="/start", from_user=DummyFromUser(full_name="Plan User"))
-    await handle_start(message, session, db_user=user)
+    message = make_message("/start", full_name="Plan User")
+    await handle_start(message, session, db_user=user, settings=stub_subscription_settings)
 
     assert message.answers
-    assert "Plan User" in message.answers[0][0]
+    assert "Plan User" in message.answers[0]
@@ -2,23 +2,19 @@
 
 from __future__ import annotations
 
-from types import SimpleNamespace
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, select
 
-from app.db.models.core import SubscriptionPlan, UsageHourlyQuota, User
+from _factories import free_plan, subscription_settings
+from app.db.models.core import UsageHourlyQuota, User
 from app.services.exceptions import RateLimitExceeded
-from app.services.rate_limit import RateLimiter
+from app.services.rate_limit import RateLimiter, _current_window_start, sweep_old_windows
 from app.services.subscriptions import SubscriptionService
 from app.utils.datetime import utc_now
 
 
-def _stub_settings() -> SimpleNamespace:
-    return SimpleNamespace(subscriptions=SimpleNamespace(subscription_duration_days=30))
-
-
 async def _create_user(session) -> User:
     user = User(telegram_id=987654321)
     session.add(user)
@@ -26,12 +22,31 @@ async def _create_user(session) -> User:
     return user
 
 
+def test_current_window_start_truncates_to_utc_hour():
+    first = datetime(2024, 5, 1, 10, 59, 59, 999999, tzinfo=timezone.utc)
+    second = datetime(2024, 5, 1, 11, 0, 0, tzinfo=timezone.utc)
+
+    assert _current_window_start(first) == first.replace(minute=0, second=0, microsecond=0)
+    assert _current_window_start(first) is _current_window_start(first)
+    assert _current_window_start(second) == second
+
+
+def test_current_window_start_keeps_input_timezone():
+    india = timezone(timedelta(hours=5, minutes=30))
+    aware = datetime(2024, 5, 1, 10, 45, tzinfo=india)
+    naive = datetime(2024, 5, 1, 10, 45)
+
+    assert _current_window_start(aware) == datetime(2024, 5, 1, 10, tzinfo=india)
+    assert _current_window_start(naive) == datetime(2024, 5, 1, 10)
+    assert _current_window_start(naive).tzinfo is None
+
+
 @pytest.mark.asyncio
-async def test_rate_limiter_cleans_old_windows(session):
+async def test_sweep_old_windows_removes_expired_rows(session):
     user = await _create_user(session)
-    limiter = RateLimiter(session, retention_hours=1)
-
     now = utc_now()
+    limiter = RateLimiter(session, clock=lambda: now)
+
     old_window = (now - timedelta(hours=2)).replace(minute=0, second=0, microsecond=0)
     session.add(
         UsageHourlyQuota(
@@ -43,36 +58,92 @@ async def test_rate_limiter_cleans_old_windows(session):
         )
     )
     await session.flush()
-
     await limiter.increment(user, hourly_limit=5)
 
+    deleted = await sweep_old_windows(session, timedelta(hours=1))
+
+    assert deleted == 1
     stmt = select(UsageHourlyQuota).where(UsageHourlyQuota.window_start == old_window)
     result = await session.execute(stmt)
     assert result.scalar_one_or_none() is None
+    usage = await limiter.get_current_usage(user)
+    assert usage is not None and usage.message_count == 1
 
 
 @pytest.mark.asyncio
 async def test_subscription_and_rate_limit_flow(session):
     user = await _create_user(session)
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="Free tier",
-        hourly_message_limit=3,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
+    plan = free_plan(description="Free tier", hourly_message_limit=3)
     session.add(plan)
     await session.flush()
 
-    subscription_service = SubscriptionService(session, settings=_stub_settings())
+    subscription_service = SubscriptionService(session, settings=subscription_settings())
     hourly_limit = await subscription_service.get_hourly_limit(user)
     assert hourly_limit == plan.hourly_message_limit
 
-    limiter = RateLimiter(session, retention_hours=24)
-    for _ in range(hourly_limit):
-        await limiter.increment(user, hourly_limit)
+    # Start the current window one message short of the limit.
+    now = utc_now()
+    window_start = _current_window_start(now)
+    session.add(
+        UsageHourlyQuota(
+            user_id=user.id,
+            window_start=window_start,
+            message_count=hourly_limit - 1,
+            tool_call_count=0,
+            last_reset_at=window_start,
+        )
+    )
+    await session.flush()
+
+    limiter = RateLimiter(session, clock=lambda: now)
+    await limiter.increment(user, hourly_limit)
 
     with pytest.raises(RateLimitExceeded):
         await limiter.increment(user, hourly_limit)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_user_is_rejected_from_cache(session):
+    user = await _create_user(session)
+    limiter = RateLimiter(session)
+
+    await limiter.increment(user, hourly_limit=1)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.increment(user, hourly_limit=1)
+
+    await session.execute(delete(UsageHourlyQuota))
+
+    with pytest.raises(RateLimitExceeded):
+        await limiter.increment(user, hourly_limit=1)
+    await limiter.increment(user, hourly_limit=2)
+
+
+@pytest.mark.asyncio
+async def test_batched_increment_is_all_or_nothing(session):
+    user = await _create_user(session)
+    limiter = RateLimiter(session)
+
+    with pytest.raises(RateLimitExceeded):
+        await limiter.increment(user, hourly_limit=3, increment_messages=4)
+    await limiter.increment(user, hourly_limit=3, increment_messages=3)
+
+    usage = await limiter.get_current_usage(user)
+    assert usage is not None and usage.message_count == 3
+    with pytest.raises(RateLimitExceeded):
+        await limiter.increment(user, hourly_limit=3)
+
+
+@pytest.mark.asyncio
+async def test_increment_uses_injected_clock(session):
+    user = await _create_user(session)
+    fixed_now = datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc)
+    limiter = RateLimiter(session, clock=lambda: fixed_now)
+
+    await limiter.increment(user, hourly_limit=5)
+
+    usage = await limiter.get_current_usage(user)
+    assert usage is not None
+    assert usage.window_start.replace(tzinfo=timezone.utc) == datetime(
+        2024, 5, 1, 10, tzinfo=timezone.utc
+    )
+    assert usage.message_count == 1
@@ -0,0 +1,46 @@
+"""Tests for the async retry helper."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.utils.retry import retry_async
+
+
+@pytest.mark.asyncio
+async def test_retry_async_backs_off_through_injected_sleep():
+    delays: list[float] = []
+    attempts = {"count": 0}
+
+    async def record_sleep(delay: float) -> None:
+        delays.append(delay)
+
+    async def flaky():
+        attempts["count"] += 1
+        if attempts["count"] < 3:
+            raise RuntimeError("boom")
+        return "ok"
+
+    result = await retry_async(flaky, base_delay=1.0, max_delay=1.5, sleep=record_sleep)
+
+    assert result == "ok"
+    assert attempts["count"] == 3
+    assert len(delays) == 2
+    assert 0.8 <= delays[0] <= 1.2
+    assert 1.2 <= delays[1] <= 1.8
+
+
+@pytest.mark.asyncio
+async def test_retry_async_does_not_sleep_on_permanent_error():
+    delays: list[float] = []
+
+    async def record_sleep(delay: float) -> None:
+        delays.append(delay)
+
+    async def broken():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        await retry_async(broken, retryable=lambda exc: False, sleep=record_sleep)
+
+    assert delays == []
@@ -4,8 +4,9 @@ from __future__ import annotations
 
 import json
 
-import pytest
 import httpx
+import orjson
+import pytest
 from pydantic import SecretStr
 
 from app.config import ExternalToolSettings
@@ -16,52 +17,71 @@ from app.services.external_tools import (
     WebContentService,
 )
 
+_FRAGMENT_FETCH_BODY = b"url=https%3A%2F%2Fexample.com%2F%23section"
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_GOOGLE_SEARCH_BODY = orjson.dumps(
+    {
+        "search_metadata": {"id": "123"},
+        "search_parameters": {"q": "python testing"},
+        "organic_results": [{"title": "Result"}],
+    }
+)
+_JUDGE0_SUBMISSION_BODY = orjson.dumps(
+    {
+        "token": "abc",
+        "status": {"id": 3, "description": "Accepted"},
+        "stdout": "b2s=",
+        "stderr": None,
+        "compile_output": None,
+        "message": None,
+        "time": "0.1",
+        "memory": 1024,
+    }
+)
+
 
 @pytest.mark.asyncio
-async def test_google_search_requires_api_key():
-    async with httpx.AsyncClient() as client:
-        service = SearchService(client, settings=ExternalToolSettings())
-        with pytest.raises(ToolServiceError):
-            await service.google_search("python")
+async def test_search_ignores_empty_query(http_client):
+    # No handler is routed, so any HTTP call would fail the test.
+    service = SearchService(http_client, settings=ExternalToolSettings())
+    assert await service.search("   ") == []
 
 
 @pytest.mark.asyncio
-async def test_google_search_success(monkeypatch):
+async def test_google_search_requires_api_key(http_client):
+    service = SearchService(http_client, settings=ExternalToolSettings())
+    with pytest.raises(ToolServiceError):
+        await service.google_search("python")
+
+
+@pytest.mark.asyncio
+async def test_google_search_success(http_client, route_http):
     async def handler(request: httpx.Request) -> httpx.Response:
         assert request.url.path == "/search"
         assert request.url.params["api_key"] == "secret"
         assert request.url.params["q"] == "python testing"
-        return httpx.Response(
-            200,
-            json={
-                "search_metadata": {"id": "123"},
-                "search_parameters": {"q": "python testing"},
-                "organic_results": [{"title": "Result"}],
-            },
-        )
+        return httpx.Response(200, content=_GOOGLE_SEARCH_BODY, headers=_JSON_HEADERS)
 
-    transport = httpx.MockTransport(handler)
-    async with httpx.AsyncClient(transport=transport) as client:
-        settings = ExternalToolSettings(serpapi_api_key=SecretStr("secret"))
-        service = SearchService(client, settings=settings)
-        payload = await service.google_search("python testing")
+    route_http(handler)
+    settings = ExternalToolSettings(serpapi_api_key=SecretStr("secret"))
+    service = SearchService(http_client, settings=settings)
+    payload = await service.google_search("python testing")
 
     assert payload["search_metadata"] == {"id": "123"}
     assert payload["organic_results"] == [{"title": "Result"}]
 
 
 @pytest.mark.asyncio
-async def test_fetch_url_normalizes_scheme():
+async def test_fetch_url_normalizes_scheme(http_client, route_http):
     requested: list[str] = []
 
     async def handler(request: httpx.Request) -> httpx.Response:
         requested.append(str(request.url))
         return httpx.Response(200, text="body", headers={"Content-Type": "text/plain"})
 
-    transport = httpx.MockTransport(handler)
-    async with httpx.AsyncClient(transport=transport) as client:
-        service = WebContentService(client, settings=ExternalToolSettings())
-        payload = await service.fetch("example.com/path")
+    route_http(handler)
+    service = WebContentService(http_client, settings=ExternalToolSettings())
+    payload = await service.fetch("example.com/path")
 
     assert requested == ["https://r.jina.ai/https://example.com/path"]
     assert payload["status_code"] == 200
@@ -69,63 +89,48 @@ async def test_fetch_url_normalizes_scheme():
 
 
 @pytest.mark.asyncio
-async def test_fetch_url_with_fragment_uses_post():
+async def test_fetch_url_with_fragment_uses_post(http_client, route_http):
     methods: list[str] = []
 
     async def handler(request: httpx.Request) -> httpx.Response:
         methods.append(request.method)
         assert request.url == httpx.URL("https://r.jina.ai/")
-        assert b"url=https%3A%2F%2Fexample.com%2F%23section" in request.content
+        assert request.content == _FRAGMENT_FETCH_BODY
         return httpx.Response(200, text="body")
 
-    transport = httpx.MockTransport(handler)
-    async with httpx.AsyncClient(transport=transport) as client:
-        service = WebContentService(client, settings=ExternalToolSettings())
-        await service.fetch("example.com/#section")
+    route_http(handler)
+    service = WebContentService(http_client, settings=ExternalToolSettings())
+    await service.fetch("example.com/#section")
 
     assert methods == ["POST"]
 
 
 @pytest.mark.asyncio
-async def test_execute_python_code_requires_url():
-    async with httpx.AsyncClient() as client:
-        service = CodeExecutionService(client, settings=ExternalToolSettings())
-        with pytest.raises(ToolServiceError):
-            await service.execute("print('hi')")
+async def test_execute_python_code_requires_url(http_client):
+    service = CodeExecutionService(http_client, settings=ExternalToolSettings())
+    with pytest.raises(ToolServiceError):
+        await service.execute("print('hi')")
 
 
 @pytest.mark.asyncio
-async def test_execute_python_code_success():
+async def test_execute_python_code_success(http_client, route_http):
     async def handler(request: httpx.Request) -> httpx.Response:
         assert request.headers["X-Auth-Token"] == "jk"
         assert request.url == httpx.URL(
             "https://judge0.example/api/submissions?base64_encoded=true&wait=true"
         )
-        body = json.loads(request.content.decode("utf-8"))
+        body = json.loads(request.content)
         assert body["language_id"] == 99
-        return httpx.Response(
-            200,
-            json={
-                "token": "abc",
-                "status": {"id": 3, "description": "Accepted"},
-                "stdout": "b2s=",
-                "stderr": None,
-                "compile_output": None,
-                "message": None,
-                "time": "0.1",
-                "memory": 1024,
-            },
-        )
+        return httpx.Response(200, content=_JUDGE0_SUBMISSION_BODY, headers=_JSON_HEADERS)
 
-    transport = httpx.MockTransport(handler)
+    route_http(handler)
     settings = ExternalToolSettings(
         judge0_api_url="https://judge0.example/api",
         judge0_api_key=SecretStr("jk"),
         judge0_language_id=99,
     )
-    async with httpx.AsyncClient(transport=transport) as client:
-        service = CodeExecutionService(client, settings=settings)
-        payload = await service.execute("print('ok')")
+    service = CodeExecutionService(http_client, settings=settings)
+    payload = await service.execute("print('ok')")
 
     assert payload["stdout"] == "ok"
     assert payload["stderr"] == ""
@@ -0,0 +1,61 @@
+"""Tests for startup seed helpers."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from _factories import free_plan
+from app.db.models.core import SubscriptionPlan
+from app.services.seeds import ensure_subscription_plans
+
+
+@pytest.mark.asyncio
+async def test_ensure_subscription_plans_inserts_and_updates(session):
+    session.add(free_plan(name="Legacy", hourly_message_limit=1, is_active=False))
+    await session.flush()
+
+    await ensure_subscription_plans(session, settings=None)
+    await ensure_subscription_plans(session, settings=None)
+
+    plans = (
+        await session.scalars(
+            select(SubscriptionPlan)
+            .order_by(SubscriptionPlan.priority)
+            .execution_options(populate_existing=True)
+        )
+    ).all()
+
+    assert [plan.code for plan in plans] == ["FREE", "PLUS", "PRO", "MAX"]
+    free = plans[0]
+    assert free.name == "Free"
+    assert free.hourly_message_limit == 10
+    assert free.is_active is True
+
+
+@pytest.mark.asyncio
+async def test_ensure_subscription_plans_demotes_other_default(session):
+    session.add(
+        SubscriptionPlan(
+            code="TRIAL",
+            name="Trial",
+            hourly_message_limit=5,
+            monthly_price=0.0,
+            priority=5,
+            is_default=True,
+            is_active=True,
+        )
+    )
+    await session.flush()
+
+    await ensure_subscription_plans(session, settings=None)
+
+    plans = {
+        plan.code: plan
+        for plan in await session.scalars(
+            select(SubscriptionPlan).execution_options(populate_existing=True)
+        )
+    }
+    assert plans["FREE"].is_default is True
+    assert plans["TRIAL"].is_default is False
+    assert plans["TRIAL"].name == "Trial"
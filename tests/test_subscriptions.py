@@ -2,29 +2,17 @@
 
 from __future__ import annotations
 
-from types import SimpleNamespace
-
 import pytest
+from sqlalchemy.exc import IntegrityError
 
-from app.db.models.core import SubscriptionPlan, User
+from _factories import free_plan, make_user, plus_plan, pro_plan, subscription_settings
+from app.db.models.core import User
 from app.services.subscriptions import SubscriptionService
 
 
-def _stub_settings() -> SimpleNamespace:
-    return SimpleNamespace(subscriptions=SimpleNamespace(subscription_duration_days=30))
-
-
 async def _bootstrap_user_and_plan(session):
-    plan = SubscriptionPlan(
-        code="FREE",
-        name="Free",
-        description="Free tier",
-        hourly_message_limit=10,
-        monthly_price=0.0,
-        priority=0,
-        is_default=True,
-    )
-    user = User(telegram_id=12345, username="tester")
+    plan = free_plan(description="Free tier")
+    user = make_user(12345)
     session.add_all([plan, user])
     await session.flush()
     return user, plan
@@ -33,7 +21,7 @@ async def _bootstrap_user_and_plan(session):
 @pytest.mark.asyncio
 async def test_ensure_default_subscription_creates_record(session):
     user, plan = await _bootstrap_user_and_plan(session)
-    service = SubscriptionService(session, settings=_stub_settings())
+    service = SubscriptionService(session, settings=subscription_settings())
 
     subscription = await service.ensure_default_subscription(user)
 
@@ -49,7 +37,7 @@ async def test_ensure_default_subscription_creates_record(session):
 @pytest.mark.asyncio
 async def test_get_hourly_limit_uses_default_plan(session):
     user, plan = await _bootstrap_user_and_plan(session)
-    service = SubscriptionService(session, settings=_stub_settings())
+    service = SubscriptionService(session, settings=subscription_settings())
 
     limit = await service.get_hourly_limit(user)
 
@@ -59,3 +47,33 @@ async def test_get_hourly_limit_uses_default_plan(session):
     assert active.plan_id == plan.id
     assert active.plan is not None
     assert active.plan.hourly_message_limit == plan.hourly_message_limit
+
+
+@pytest.mark.asyncio
+async def test_default_plan_lookup_is_cached_until_invalidated(session):
+    user, plan = await _bootstrap_user_and_plan(session)
+    service = SubscriptionService(session, settings=subscription_settings())
+    await service.ensure_default_subscription(user)
+
+    plan.is_default = False
+    other = User(telegram_id=54321, username="other")
+    session.add(other)
+    await session.flush()
+
+    cached = await service.ensure_default_subscription(other)
+    assert cached.plan_id == plan.id
+
+    SubscriptionService.invalidate_default_plan()
+    with pytest.raises(RuntimeError):
+        await service.ensure_default_subscription(other)
+
+
+@pytest.mark.asyncio
+async def test_only_one_active_default_plan_is_allowed(session):
+    session.add(free_plan())
+    session.add(plus_plan(is_default=True, is_active=False))
+    await session.flush()
+
+    session.add(pro_plan(is_default=True))
+    with pytest.raises(IntegrityError):
+        await session.flush()
@@ -67,7 +67,7 @@ def test_summary_agent_accepts_full_azure_override():
 
 
 @pytest.mark.asyncio
-async def test_summary_agent_retries_on_failure(monkeypatch):
+async def test_summary_agent_retries_on_failure(no_retry_backoff):
     settings = _base_settings(
         llm=LLMSettings(
             provider="openai",
@@ -87,11 +87,6 @@ async def test_summary_agent_retries_on_failure(monkeypatch):
 
     summary_agent.agent.run = fake_run  # type: ignore[assignment]
 
-    async def _noop(delay):
-        return None
-
-    monkeypatch.setattr("app.utils.retry.asyncio.sleep", _noop)
-
     result = await summary_agent.summarize("hello")
     assert attempts["count"] == 3
     assert result == "success"
@@ -1,27 +1,23 @@
 """Unit tests for the token estimation helper."""
 
-from app.utils.tokens import estimate_tokens
-
-
-def test_estimate_tokens_handles_empty():
-    assert estimate_tokens("") == 0
-
-
-def test_estimate_tokens_counts_whitespace():
-    assert estimate_tokens("   \n   ") == 4
+import pytest
 
-
-def test_estimate_tokens_counts_ascii_pairs():
-    assert estimate_tokens("ab") == 1
-    assert estimate_tokens("abc") == 2
-    assert estimate_tokens("a b c d") == 4
-
-
-def test_estimate_tokens_counts_non_ascii_per_char():
-    assert estimate_tokens("你好") == 2
-    assert estimate_tokens("你 好") == 3
+from app.utils.tokens import estimate_tokens
 
 
-def test_estimate_tokens_handles_mixed_text():
-    assert estimate_tokens("hi你好") == 3
-    assert estimate_tokens("OK，好的") == 4
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        pytest.param("", 0, id="empty"),
+        pytest.param("   \n   ", 4, id="whitespace"),
+        pytest.param("ab", 1, id="ascii-pair"),
+        pytest.param("abc", 2, id="ascii-odd"),
+        pytest.param("a b c d", 4, id="ascii-spaced"),
+        pytest.param("你好", 2, id="non-ascii"),
+        pytest.param("你 好", 3, id="non-ascii-spaced"),
+        pytest.param("hi你好", 3, id="mixed"),
+        pytest.param("OK，好的", 4, id="mixed-punctuation"),
+    ],
+)
+def test_estimate_tokens(text, expected):
+    assert estimate_tokens(text) == expected
@@ -11,9 +11,9 @@ def _make_user():
     return User(telegram_id=999, username="tester", language_code="en")
 
 
-def _make_conversation(user_id: int, title: str = "Chat") -> Conversation:
+def _make_conversation(user: User, title: str = "Chat") -> Conversation:
     return Conversation(
-        user_id=user_id,
+        user=user,
         title=title,
         context_tokens=0,
         status="active",
@@ -38,34 +38,26 @@ async def test_upsert_impression_creates_and_updates(session):
 @pytest.mark.asyncio
 async def test_fetch_permanent_summaries_window(session):
     user = _make_user()
-    session.add(user)
-    await session.flush()
-    convo1 = _make_conversation(user_id=user.id, title="Chat 1")
-    convo2 = _make_conversation(user_id=user.id, title="Chat 2")
-    session.add_all([convo1, convo2])
-    await session.flush()
-
+    convo1 = _make_conversation(user, title="Chat 1")
+    convo2 = _make_conversation(user, title="Chat 2")
     now = datetime.now(timezone.utc)
     archive1 = ConversationArchive(
-        conversation_id=convo1.id,
-        user_id=user.id,
+        conversation=convo1,
+        user=user,
         summary_text="Most recent summary",
         history=[],
         token_count=10,
         created_at=now,
     )
-    session.add(archive1)
-    await session.flush()
-
     archive2 = ConversationArchive(
-        conversation_id=convo2.id,
-        user_id=user.id,
+        conversation=convo2,
+        user=user,
         summary_text="Older summary",
         history=[],
         token_count=8,
         created_at=now - timedelta(days=1),
     )
-    session.add(archive2)
+    session.add_all([user, convo1, convo2, archive1, archive2])
     await session.flush()
 
     service = UserInsightService(session)
@@ -76,4 +68,32 @@ async def test_fetch_permanent_summaries_window(session):
     assert result["range_end"] == 2
     assert len(result["records"]) == 2
     assert result["records"][0]["summary"] == "Most recent summary"
+    # Rendered from created_at at query time, as stored (naive UTC) by the database.
+    assert result["records"][0]["created_at"] == now.replace(tzinfo=None).isoformat(sep=" ")
     assert result["records"][1]["summary"] == "Older summary"
+
+
+@pytest.mark.asyncio
+async def test_fetch_permanent_summaries_past_last_page_keeps_total(session):
+    user = _make_user()
+    archives = [
+        ConversationArchive(
+            conversation=_make_conversation(user, title=f"Chat {index}"),
+            user=user,
+            summary_text=f"Summary {index}",
+            history=[],
+            token_count=1,
+        )
+        for index in range(2)
+    ]
+    session.add_all([user, *archives])
+    await session.flush()
+
+    service = UserInsightService(session)
+    result = await service.fetch_permanent_summaries(user.id, start=5, end=8)
+
+    # The page is empty, so the total comes from the separate COUNT query.
+    assert result["records"] == []
+    assert result["total"] == 2
+    assert result["range_start"] == 5
+    assert result["range_end"] == 4